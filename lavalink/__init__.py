@@ -10,12 +10,19 @@ __version__ = '3.0.0'
 import logging
 import sys
 from .client import Client
+from .coordinator import SharedNodeStats
+from .eventstream import EventStream
 from .events import TrackStartEvent, TrackStuckEvent, TrackExceptionEvent, TrackEndEvent, QueueEndEvent
-from .models import BasePlayer, DefaultPlayer, AudioTrack, NoPreviousTrack, InvalidTrack
-from .node import Node
+from .exceptions import NodeException, NodeCapacityExceeded, RateLimitExceeded
+from .models import BasePlayer, DefaultPlayer, AudioTrack, LazyAudioTrack, TrackInfo, Queue, QueueView, NoPreviousTrack, InvalidTrack
+from .node import Node, PoolSettings
 from .nodemanager import NodeManager
-from .playermanager import PlayerManager
+from .playermanager import PlayerManager, BulkResult
+from .ratelimit import RateLimiter
+from .rebalancer import Rebalancer, FrameLossRebalancer, LoadRebalancer
+from .stats import Capacity
 from .utils import format_time
+from .watchdog import Watchdog
 from .websocket import WebSocket
 
 
@@ -2,15 +2,17 @@ import asyncio
 import logging
 import random
 import inspect
+import json
 from urllib.parse import quote
 
 import aiohttp
 
-from .models import DefaultPlayer
-from .node import Node
+from .models import DefaultPlayer, AudioTrack, InvalidTrack
+from .node import Node, PoolSettings
 from .nodemanager import NodeManager
 from .playermanager import PlayerManager
 from .events import Event
+from .eventstream import EventStream
 
 log = logging.getLogger('lavalink')
 
@@ -27,9 +29,18 @@ class Client:
         The user id of the bot.
     shard_count: Optional[int]
         The amount of shards your bot has.
-    pool_size: Optional[int]
-        The amount of connections to keep in a pool,
-        used for HTTP requests and WS connections.
+    pool_settings: Optional[PoolSettings]
+        The default settings for the connection pool each node keeps
+        for its HTTP requests and WS connection.
+    executor: Optional[concurrent.futures.ProcessPoolExecutor]
+        The executor to parse large REST responses in. This should be a process pool, as parsing holds the GIL
+        and would block the event loop from a thread all the same. Responses are parsed on the event loop if
+        this isn't given. Note that this gains little, as the parsed response is pickled back to the event
+        loop, and unpickling it still takes more than half as long as parsing it there would.
+    offload_threshold: Optional[int]
+        The size in bytes above which REST responses are parsed in the executor instead of on the event loop.
+    build_chunk_size: Optional[int]
+        The amount of tracks :func:`build_tracks` builds before letting other tasks run.
     loop: Optional[event loop]
         The `event loop`_ to use for asynchronous operations.
     player: Optional[BasePlayer]
@@ -39,29 +50,135 @@ class Client:
         A dictionary representing region -> discord endpoint. You should only
         change this if you know what you're doing and want more control over
         which regions handle specific locations.
+    resolve_concurrency: Optional[int]
+        The maximum amount of queued queries that may be resolved at once, across all players.
     """
+    _voice_events = frozenset(('VOICE_SERVER_UPDATE', 'VOICE_STATE_UPDATE'))
 
     def __init__(self, user_id: int, shard_count: int = 1,
-                 loop=None, player=DefaultPlayer, regions: dict = None):
+                 loop=None, player=DefaultPlayer, regions: dict = None, resolve_concurrency: int = 5,
+                 pool_settings: PoolSettings = None, executor=None, offload_threshold: int = 262144,
+                 build_chunk_size: int = 500):
         self._user_id = str(user_id)
         self._shard_count = str(shard_count)
         self._loop = loop or asyncio.get_event_loop()
+        self.pool_settings = pool_settings or PoolSettings()
+        self.offload_threshold = offload_threshold
+        self.build_chunk_size = build_chunk_size
+        self._executor = executor
         self.node_manager = NodeManager(self, regions)
         self.players = PlayerManager(self, player)
 
         self._event_hooks = []
+        self._event_streams = []
+        # Hooks and streams for specific guilds, keyed by guild ID, so an event only reaches the ones for its guild.
+        self._guild_event_hooks = {}
+        self._guild_event_streams = {}
+        self._resolve_semaphore = asyncio.Semaphore(resolve_concurrency)
 
-        self._session = aiohttp.ClientSession(
-            connector=aiohttp.TCPConnector(loop=loop),
-            timeout=aiohttp.ClientTimeout(total=30)
-        )  # This session will be used for websocket and http requests.
+        self.filtered_frames = 0  # Gateway payloads rejected by the voice update handlers because they aren't voice events.
+        self.handled_frames = 0  # Voice events that were passed on to a player.
 
-    def add_event_hook(self, hook):
-        if hook not in self._event_hooks:
-            self._event_hooks.append(hook)
+    def add_event_hook(self, hook, guild_id: int = None):
+        """
+        Registers a function or coroutine to be called with every dispatched event.
+        ----------
+        :param hook:
+            The function or coroutine to register.
+        :param guild_id:
+            The guild ID to only receive events for. The hook is removed when that guild's player is.
+        """
+        hooks = self._event_hooks if guild_id is None else self._guild_event_hooks.setdefault(int(guild_id), [])
+
+        if hook not in hooks:
+            hooks.append(hook)
+
+    def remove_event_hook(self, hook, guild_id: int = None):
+        """
+        Unregisters a hook added with :func:`add_event_hook`.
+        ----------
+        :param hook:
+            The function or coroutine to unregister.
+        :param guild_id:
+            The guild ID the hook was registered for, if any.
+        """
+        if guild_id is None:
+            if hook in self._event_hooks:
+                self._event_hooks.remove(hook)
+            return
+
+        hooks = self._guild_event_hooks.get(int(guild_id))
+
+        if hooks and hook in hooks:
+            hooks.remove(hook)
+
+            if not hooks:
+                del self._guild_event_hooks[int(guild_id)]
+
+    def events(self, types: tuple = None, guilds: list = None, maxsize: int = 100, overflow: str = 'drop_oldest'):
+        """
+        Subscribes to events as an asynchronous iterator. Unlike event hooks, which run as events
+        are received, events are buffered for the stream and consumed at its own pace.
+
+        Usage:
+            .. code:: python
+
+                async with lavalink_client.events(types=(TrackStartEvent, TrackEndEvent)) as stream:
+                    async for event in stream:
+                        ...
+
+        ----------
+        :param types:
+            The event classes to receive. Defaults to all events.
+        :param guilds:
+            The guild IDs to receive events for. Defaults to all events, including those without a player.
+            The stream stops receiving events for a guild when its player is removed, and is closed
+            once none of its guilds are left.
+        :param maxsize:
+            The maximum amount of events to buffer.
+        :param overflow:
+            What to do with events once the buffer is full. One of ``drop_oldest``,
+            ``drop_newest`` or ``coalesce``. See :class:`EventStream`.
+        """
+        stream = EventStream(self, types, guilds, maxsize, overflow)
+
+        if stream.guilds is None:
+            self._event_streams.append(stream)
+        else:
+            for guild_id in stream.guilds:
+                self._guild_event_streams.setdefault(guild_id, []).append(stream)
+
+        return stream
+
+    def _remove_stream(self, stream: EventStream):
+        if stream.guilds is None:
+            if stream in self._event_streams:
+                self._event_streams.remove(stream)
+            return
+
+        for guild_id in stream.guilds:
+            streams = self._guild_event_streams.get(guild_id)
+
+            if streams and stream in streams:
+                streams.remove(stream)
+
+                if not streams:
+                    del self._guild_event_streams[guild_id]
+
+    def _remove_guild_subscriptions(self, guild_id: int):
+        """ Removes the hooks and streams that are only subscribed to the given guild's events. """
+        guild_id = int(guild_id)
+        self._guild_event_hooks.pop(guild_id, None)
+
+        for stream in self._guild_event_streams.pop(guild_id, ()):
+            stream.guilds = stream.guilds - {guild_id}
+
+            if not stream.guilds:
+                stream.close()
 
     def add_node(self, host: str, port: int, password: str, region: str,
-                 resume_key: str = None, resume_timeout: int = 60, name: str = None):
+                 resume_key: str = None, resume_timeout: int = 60, name: str = None, rate_limiter=None,
+                 capacity=None, pool_settings: PoolSettings = None):
         """
         Adds a node to Lavalink's node manager.
         ----------
@@ -79,10 +196,95 @@ class Client:
             How long the node should wait for a connection while disconnected before clearing all players.
         :param name:
             An identifier for the node that will show in logs.
+        :param rate_limiter:
+            A :class:`RateLimiter` to apply to REST requests made to this node.
+            Requests that exceed it raise :class:`RateLimitExceeded`.
+        :param capacity:
+            The :class:`Capacity` at which the node should stop receiving new players.
+        :param pool_settings:
+            The :class:`PoolSettings` for the node's HTTP connection pool. Defaults to the client's.
         """
-        self.node_manager.add_node(host, port, password, region, name, resume_key, resume_timeout)
+        self.node_manager.add_node(host, port, password, region, name, resume_key, resume_timeout, rate_limiter, capacity,
+                                   pool_settings)
+
+    async def wait_until_ready(self, min_nodes: int = None, timeout: float = None):
+        """|coro|
+
+        Waits until the given amount of nodes are connected.
+        -----------------
+        :param min_nodes:
+            The amount of nodes that need to be connected. Defaults to all nodes.
+        :param timeout:
+            The maximum amount of seconds to wait before raising :class:`asyncio.TimeoutError`.
+
+        Returns
+        ---------
+        A dict of node -> the amount of seconds it took to connect, or ``None`` if it isn't connected yet.
+        """
+        nodes = list(self.node_manager.nodes)
+        required = len(nodes) if min_nodes is None else min_nodes
+        pending = [asyncio.ensure_future(node.wait_until_ready()) for node in nodes]
+        deadline = None if timeout is None else self._loop.time() + timeout
+
+        try:
+            while sum(task.done() for task in pending) < required:
+                remaining = None if deadline is None else deadline - self._loop.time()
+                waiting = [task for task in pending if not task.done()]
+
+                if not waiting or (remaining is not None and remaining <= 0):
+                    raise asyncio.TimeoutError
 
-    async def get_tracks(self, query: str, node: Node = None):
+                await asyncio.wait(waiting, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        return {node: node.time_to_ready for node in nodes}
+
+    async def connect_all(self, timeout: float = None, warm_connections: int = 2):
+        """|coro|
+
+        Waits for every node to connect, and opens HTTP keep-alive connections to each of them
+        as soon as it's ready, so the first searches after startup don't pay for connection setup.
+        Nodes connect concurrently, so this takes about as long as the slowest node.
+        -----------------
+        :param timeout:
+            The maximum amount of seconds to wait for each node.
+        :param warm_connections:
+            The amount of HTTP connections to open per node.
+
+        Returns
+        ---------
+        A dict of node -> the amount of seconds it took to connect, or ``None`` if it didn't connect in time.
+        """
+        async def prepare(node):
+            try:
+                await asyncio.wait_for(node.wait_until_ready(), timeout)
+            except asyncio.TimeoutError:
+                log.warning('[NODE-{}] Not ready after {} seconds'.format(node.name, timeout))
+                return
+
+            if warm_connections:
+                await node.warm_up(warm_connections)
+
+        nodes = list(self.node_manager.nodes)
+        await asyncio.gather(*(prepare(node) for node in nodes))
+        return {node: node.time_to_ready for node in nodes}
+
+    async def close(self):
+        """|coro|
+
+        Stops the client's background tasks and closes the connections of all nodes.
+        """
+        self.players.stop_reaper()
+        self.players.stop_watchdog()
+
+        for rebalancer in list(self.node_manager.rebalancers):
+            self.node_manager.remove_rebalancer(rebalancer)
+
+        await asyncio.gather(*(self.node_manager.remove_node(node) for node in list(self.node_manager.nodes)))
+
+    async def get_tracks(self, query: str, node: Node = None, guild_id: int = None):
         """|coro|
 
         Gets all tracks associated with the given query.
@@ -91,16 +293,24 @@ class Client:
             The query to perform a search for.
         :param node:
             The node to use for track lookup. Leave this blank to use a random node.
+        :param guild_id:
+            The guild the search is made for. This is used to queue requests fairly when the node is rate limited.
         """
         node = node or random.choice(self.node_manager.available_nodes)
+
+        if node.rate_limiter:
+            await node.rate_limiter.acquire(guild_id)
+
         destination = 'http://{}:{}/loadtracks?identifier={}'.format(node.host, node.port, quote(query))
         headers = {
             'Authorization': node.password
         }
 
-        async with self._session.get(destination, headers=headers) as res:
+        timeout = aiohttp.ClientTimeout(total=node.pool_settings.search_timeout)
+
+        async with node._session.get(destination, headers=headers, timeout=timeout) as res:
             if res.status == 200:
-                return await res.json()
+                return await self._parse_json(await res.read())
 
             return []
 
@@ -121,14 +331,20 @@ class Client:
         A dict representing the track's information.
         """
         node = node or random.choice(self.node_manager.available_nodes)
+
+        if node.rate_limiter:
+            await node.rate_limiter.acquire()
+
         destination = 'http://{}:{}/decodetrack?track={}'.format(node.host, node.port, track)
         headers = {
             'Authorization': node.password
         }
 
-        async with self._session.get(destination, headers=headers) as res:
+        timeout = aiohttp.ClientTimeout(total=node.pool_settings.decode_timeout)
+
+        async with node._session.get(destination, headers=headers, timeout=timeout) as res:
             if res.status == 200:
-                return await res.json()
+                return await self._parse_json(await res.read())
 
             return None
 
@@ -149,17 +365,73 @@ class Client:
         An array of dicts representing track information.
         """
         node = node or random.choice(self.node_manager.available_nodes)
+
+        if node.rate_limiter:
+            await node.rate_limiter.acquire()
+
         destination = 'http://{}:{}/decodetracks'.format(node.host, node.port)
         headers = {
             'Authorization': node.password
         }
 
-        async with self._session.post(destination, headers=headers, json=tracks) as res:
+        timeout = aiohttp.ClientTimeout(total=node.pool_settings.decode_timeout)
+
+        async with node._session.post(destination, headers=headers, json=tracks, timeout=timeout) as res:
             if res.status == 200:
-                return await res.json()
+                return await self._parse_json(await res.read())
 
             return None
 
+    async def build_tracks(self, tracks: list, requester: int, **kwargs):
+        """|coro|
+
+        Builds :class:`AudioTrack` objects for a list of tracks returned from Lavalink, such as
+        a loaded playlist. Large lists are built in chunks of :attr:`build_chunk_size`, letting
+        other tasks run in between, so the event loop isn't blocked. Tracks that are invalid are skipped.
+
+        Parameters
+        ----------
+        tracks: list[dict]
+            The tracks to build.
+        requester: int
+            The ID of the user who requested the tracks.
+        kwargs:
+            Preferences to store on each track.
+
+        Returns
+        ---------
+        A list of AudioTracks.
+        """
+        # Built on the event loop, as tracks built in another process wouldn't share their information with
+        # existing ones, and building them in a thread would hold the GIL all the same.
+        built = []
+
+        for start in range(0, len(tracks), self.build_chunk_size):
+            if start:
+                await asyncio.sleep(0)
+
+            built.extend(self._build_tracks(tracks[start:start + self.build_chunk_size], requester, kwargs))
+
+        return built
+
+    @staticmethod
+    def _build_tracks(tracks: list, requester: int, preferences: dict):
+        built = []
+
+        for track in tracks:
+            try:
+                built.append(AudioTrack.build(track, requester, **preferences))
+            except InvalidTrack:
+                log.debug('Skipping invalid track {}'.format(track))
+
+        return built
+
+    async def _parse_json(self, body: bytes):
+        if self._executor is None or len(body) < self.offload_threshold:
+            return json.loads(body)
+
+        return await self._loop.run_in_executor(self._executor, json.loads, body)
+
     async def voice_update_handler(self, data):
         """|coro|
 
@@ -174,36 +446,75 @@ class Client:
         :param data:
             The payload received from Discord.
         """
-        if not data or 't' not in data:
+        event = data.get('t') if data else None
+
+        if event not in self._voice_events:
+            self.filtered_frames += 1
             return
 
-        if data['t'] == 'VOICE_SERVER_UPDATE':
+        if event == 'VOICE_SERVER_UPDATE':
             guild_id = int(data['d']['guild_id'])
             player = self.players.get(guild_id)
 
             if player:
+                self.handled_frames += 1
                 await player._voice_server_update(data['d'])
-        elif data['t'] == 'VOICE_STATE_UPDATE':
-            if int(data['d']['user_id']) != int(self._user_id):
+        else:
+            if str(data['d']['user_id']) != self._user_id:
                 return
 
             guild_id = int(data['d']['guild_id'])
             player = self.players.get(guild_id)
 
             if player:
+                self.handled_frames += 1
                 await player._voice_state_update(data['d'])
-        else:
+
+    async def raw_voice_update_handler(self, payload):
+        """|coro|
+
+        Like :func:`voice_update_handler`, but takes the raw, decompressed gateway payload.
+        Payloads that can't contain a voice event are rejected before they're parsed,
+        so only voice events and the rare payload that mentions one are decoded.
+
+        -------------
+        :example:
+            bot.add_listener(lavalink_client.raw_voice_update_handler, 'on_socket_raw_receive')
+
+        :param payload:
+            The payload received from Discord, as ``str`` or ``bytes``.
+        """
+        marker = b'"VOICE_S' if isinstance(payload, (bytes, bytearray)) else '"VOICE_S'
+
+        if marker not in payload:
+            self.filtered_frames += 1
             return
 
+        await self.voice_update_handler(json.loads(payload))
+
     async def _dispatch_event(self, event: Event):
         """|coro|
 
-        Dispatches the given event to all registered hooks.
+        Dispatches the given event to all event streams and registered hooks.
         ----------
         :param event:
             The event to dispatch to the hooks.
         """
-        for hook in self._event_hooks:
+        guild_id = EventStream._guild_of(event)
+        streams = self._event_streams
+        hooks = self._event_hooks
+
+        if guild_id is not None:
+            if guild_id in self._guild_event_streams:
+                streams = streams + self._guild_event_streams[guild_id]
+
+            if guild_id in self._guild_event_hooks:
+                hooks = hooks + self._guild_event_hooks[guild_id]
+
+        for stream in streams:
+            stream._push(event)
+
+        for hook in hooks:
             try:
                 if inspect.iscoroutinefunction(hook):
                     await hook(event)
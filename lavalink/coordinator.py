@@ -0,0 +1,143 @@
+import mmap
+import os
+import struct
+from time import time
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows.
+    fcntl = None
+
+
+class SharedNodeStats:
+    """
+    Shares node penalties and pending placements between bot processes on the same machine,
+    through a memory-mapped file. Every process that uses the same file sees the players
+    the others have placed since the last stats update, so they don't all pick the same
+    "least loaded" node at once.
+
+    Assign an instance to :attr:`NodeManager.coordinator` in every process. Nodes are
+    matched between processes by name, so they should be added with the same name everywhere.
+    This requires a platform with ``fcntl``.
+
+    Parameters
+    ----------
+    path: str
+        The file to share stats through, e.g. ``/dev/shm/lavalink-stats``.
+    max_nodes: Optional[int]
+        The maximum amount of nodes that can be tracked.
+    max_age: Optional[float]
+        The amount of seconds after which shared stats are considered stale and ignored.
+    """
+    _record = struct.Struct('<64sddi4x')  # name, penalty, updated at, pending players
+
+    def __init__(self, path: str, max_nodes: int = 64, max_age: float = 120):
+        if fcntl is None:
+            raise RuntimeError('SharedNodeStats requires fcntl, which is unavailable on this platform.')
+
+        self.path = path
+        self.max_nodes = max_nodes
+        self.max_age = max_age
+
+        size = self._record.size * max_nodes
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+
+        self._map = mmap.mmap(self._fd, size)
+        self._slots = {}
+
+    def close(self):
+        """ Unmaps the shared file. """
+        self._map.close()
+        os.close(self._fd)
+
+    def _find(self, name: str, claim: bool = False):
+        """
+        Returns the offset of the record for the given node name, or ``None`` if there is none.
+        With ``claim``, a free record is claimed for the name instead, which requires the exclusive lock.
+        Otherwise, at least the shared lock is required.
+        """
+        if name in self._slots:
+            return self._slots[name]
+
+        key = name.encode()[:64]
+
+        for index in range(self.max_nodes):
+            offset = index * self._record.size
+            existing = self._record.unpack_from(self._map, offset)[0].rstrip(b'\x00')
+
+            if existing == key or (claim and not existing):
+                if not existing:
+                    self._record.pack_into(self._map, offset, key, 0.0, 0.0, 0)
+
+                self._slots[name] = offset
+                return offset
+
+            if not existing:  # Records are claimed in order, so the name can't be further along.
+                return None
+
+        if claim:
+            raise RuntimeError('SharedNodeStats is full, increase max_nodes.')
+
+        return None
+
+    def _update(self, node, penalty: float = None, pending: int = 1):
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+        try:
+            offset = self._find(node.name, claim=True)
+            key, old_penalty, updated, old_pending = self._record.unpack_from(self._map, offset)
+
+            if penalty is None:
+                self._record.pack_into(self._map, offset, key, old_penalty, updated, old_pending + pending)
+            else:
+                self._record.pack_into(self._map, offset, key, penalty, time(), 0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def publish(self, node):
+        """
+        Publishes the node's latest stats, which also resets its pending placements.
+        ----------
+        :param node:
+            The node that received a stats update.
+        """
+        self._update(node, penalty=node.stats.penalty.total)
+
+    def add_pending(self, node, count: int = 1):
+        """
+        Records that players were placed on the node.
+        ----------
+        :param node:
+            The node the players were placed on.
+        :param count:
+            The amount of players placed.
+        """
+        self._update(node, pending=count)
+
+    def get(self, node):
+        """
+        Returns a tuple of (penalty, pending players) shared for the node, or ``None`` if
+        no process has published recent stats for it.
+        ----------
+        :param node:
+            The node to look up.
+        """
+        fcntl.flock(self._fd, fcntl.LOCK_SH)
+
+        try:
+            offset = self._find(node.name)
+
+            if offset is None:
+                return None
+
+            _, penalty, updated, pending = self._record.unpack_from(self._map, offset)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+        if time() - updated > self.max_age:
+            return None
+
+        return penalty, pending
@@ -182,3 +182,51 @@ class WebSocketClosedEvent(Event):
         self.code = code
         self.reason = reason
         self.by_remote = by_remote
+
+
+class NodeDrainProgressEvent(Event):
+    """
+    This event is dispatched each time a player is moved off a draining node.
+
+    Parameters
+    ----------
+    node: Node
+        The node that is being drained.
+    moved: int
+        The amount of players moved off the node so far.
+    remaining: int
+        The amount of players left on the node.
+    """
+    def __init__(self, node, moved, remaining):
+        self.node = node
+        self.moved = moved
+        self.remaining = remaining
+
+
+class NodeDrainedEvent(Event):
+    """
+    This event is dispatched when a draining node has no players left.
+
+    Parameters
+    ----------
+    node: Node
+        The node that was drained.
+    """
+    def __init__(self, node):
+        self.node = node
+
+
+class PlayerEvictedEvent(Event):
+    """
+    This event is dispatched when the idle player reaper destroys a player.
+
+    Parameters
+    ----------
+    player: BasePlayer
+        The player that was destroyed.
+    reason: str
+        Why the player was evicted. Either ``idle``, ``max_players`` or ``max_queued_tracks``.
+    """
+    def __init__(self, player, reason):
+        self.player = player
+        self.reason = reason
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from collections import OrderedDict, deque
+
+log = logging.getLogger('lavalink')
+
+
+class EventStream:
+    """
+    An asynchronous iterator over the events dispatched by a :class:`Client`.
+    Events are buffered per stream, so a slow consumer never holds up the websocket.
+    Create one with :func:`Client.events`.
+
+    Parameters
+    ----------
+    client: Client
+        The client to receive events from.
+    types: Optional[tuple]
+        The event classes to receive. Defaults to all events.
+    guilds: Optional[list]
+        The guild IDs to receive events for. Events that don't belong to a player are
+        only received when this isn't given.
+    maxsize: Optional[int]
+        The maximum amount of events to buffer.
+    overflow: Optional[str]
+        What to do with an event once the buffer is full. ``drop_oldest`` discards the
+        oldest buffered event, ``drop_newest`` discards the incoming event, and ``coalesce``
+        only keeps the latest event of each type for every guild, so the buffer can only
+        fill up once it holds that many distinct guilds and event types.
+    """
+    _overflow_policies = ('drop_oldest', 'drop_newest', 'coalesce')
+
+    def __init__(self, client, types: tuple = None, guilds: list = None, maxsize: int = 100,
+                 overflow: str = 'drop_oldest'):
+        if overflow not in self._overflow_policies:
+            raise ValueError('overflow must be one of {}'.format(', '.join(self._overflow_policies)))
+
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+
+        self._client = client
+        self.types = tuple(types) if types else None
+        self.guilds = frozenset(int(g) for g in guilds) if guilds else None
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.dropped = 0
+        self.closed = False
+
+        self._buffer = OrderedDict() if overflow == 'coalesce' else deque()
+        self._waiter = asyncio.Event()
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._buffer:
+            if self.closed:
+                raise StopAsyncIteration
+
+            self._waiter.clear()
+            await self._waiter.wait()
+
+        if self.overflow == 'coalesce':
+            return self._buffer.popitem(last=False)[1]
+
+        return self._buffer.popleft()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def _guild_of(event):
+        player = getattr(event, 'player', None)
+        return int(player.guild_id) if player is not None else None
+
+    def _accepts(self, event):
+        if self.types and not isinstance(event, self.types):
+            return False
+
+        return self.guilds is None or self._guild_of(event) in self.guilds
+
+    def _push(self, event):
+        """ Buffers an event without waiting. Returns whether it was accepted. """
+        if self.closed or not self._accepts(event):
+            return False
+
+        if self.overflow == 'coalesce':
+            key = (self._guild_of(event), type(event))
+
+            if key in self._buffer:
+                del self._buffer[key]  # Moves the key to the end, as it's now the newest.
+                self.dropped += 1
+            elif len(self._buffer) >= self.maxsize:
+                self._buffer.popitem(last=False)
+                self.dropped += 1
+
+            self._buffer[key] = event
+        elif len(self._buffer) < self.maxsize:
+            self._buffer.append(event)
+        elif self.overflow == 'drop_oldest':
+            self._buffer.popleft()
+            self._buffer.append(event)
+            self.dropped += 1
+        else:
+            self.dropped += 1
+            return False
+
+        self._waiter.set()
+        return True
+
+    def close(self):
+        """
+        Stops receiving events. Events that are already buffered can still be iterated over,
+        after which iteration stops.
+        """
+        if self.closed:
+            return
+
+        self.closed = True
+        self._client._remove_stream(self)
+        self._waiter.set()
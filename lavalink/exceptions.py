@@ -1,2 +1,10 @@
 class NodeException(Exception):
     """ The exception will be raised when something went wrong with a node. """
+
+
+class RateLimitExceeded(Exception):
+    """ This exception will be raised when a request was rejected by a node's rate limiter. """
+
+
+class NodeCapacityExceeded(NodeException):
+    """ This exception will be raised when a player can't be created because every node is over capacity. """
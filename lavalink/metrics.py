@@ -0,0 +1,74 @@
+from bisect import bisect_left
+
+
+class Histogram:
+    """
+    Records a distribution of values, such as latencies in milliseconds, in fixed buckets.
+    Memory use doesn't grow with the amount of values recorded.
+
+    Parameters
+    ----------
+    buckets: Optional[tuple]
+        The upper bound of each bucket, in ascending order. Values above the last bound
+        are counted in an overflow bucket.
+    """
+    default_buckets = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+    def __init__(self, buckets: tuple = None):
+        self.buckets = tuple(buckets or self.default_buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value: float):
+        """
+        Records a value.
+        ----------
+        :param value:
+            The value to record.
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self):
+        """ Returns the mean of the recorded values. """
+        return self.total / self.count if self.count else 0
+
+    def percentile(self, percentile: float):
+        """
+        Returns the upper bound of the bucket that contains the given percentile.
+        ----------
+        :param percentile:
+            The percentile to look up, between 0 and 100.
+        """
+        if not self.count:
+            return 0
+
+        threshold = self.count * percentile / 100
+        seen = 0
+
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+
+            if seen >= threshold:
+                return bound
+
+        return self.max
+
+    def to_dict(self):
+        """ Returns a summary of the distribution as a dict. """
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99)
+        }
+
+    def __repr__(self):
+        return '<Histogram count={0.count} mean={0.mean:.2f} max={0.max}>'.format(self)
@@ -1,9 +1,21 @@
+import asyncio
+import logging
+import re
+import sys
+from collections import deque
+from collections.abc import Sequence
 from abc import ABC, abstractmethod
+from functools import partial
 from random import randrange
-from time import time
+from time import monotonic, time
+from weakref import WeakValueDictionary
 from .events import (TrackStartEvent, TrackStuckEvent, TrackExceptionEvent, TrackEndEvent,
                      QueueEndEvent, PlayerUpdateEvent, NodeChangedEvent)  # noqa: F401
+from .exceptions import NodeException
 from .node import Node
+from .utils import decode_track, track_version
+
+log = logging.getLogger('lavalink')
 
 
 class InvalidTrack(Exception):
@@ -14,38 +26,523 @@ class TrackNotBuilt(Exception):
     """ This exception will be raised when AudioTrack objects hasn't been built. """
 
 
+class TrackInfo:
+    """
+    The immutable information of a track. Records are shared between every :class:`AudioTrack`
+    with the same ``track`` string, and are discarded once no AudioTrack refers to them anymore.
+
+    Only the ``track`` string is kept when a record is created. The other fields are decoded
+    from it the first time any of them is accessed.
+    """
+    __slots__ = ('track', '_is_seekable', '_fields', '__weakref__')
+
+    _cache = WeakValueDictionary()
+    _decodable_versions = (1, 2, 3)
+
+    def __init__(self, track: dict):
+        self.track = track['track']
+        info = track.get('info')
+        self._is_seekable = info.get('isSeekable') if info else None
+        self._fields = None
+
+        if not self._decodable(self.track):
+            if not info:
+                raise InvalidTrack('An invalid track was passed.')
+
+            self._fields = (info['identifier'], info['author'], info['length'], info['isStream'], info['title'], info['uri'])
+
+    @classmethod
+    def _decodable(cls, track: str):
+        try:
+            return track_version(track) in cls._decodable_versions
+        except (ValueError, IndexError):
+            return False
+
+    def _decode(self):
+        if self._fields is None:
+            try:
+                info = decode_track(self.track)['info']
+            except (ValueError, IndexError) as e:
+                raise InvalidTrack('Track could not be decoded: {}'.format(e))
+
+            self._fields = (info['identifier'], info['author'], info['length'], info['isStream'], info['title'], info['uri'])
+
+        return self._fields
+
+    @property
+    def identifier(self):
+        return self._decode()[0]
+
+    @property
+    def author(self):
+        return self._decode()[1]
+
+    @property
+    def duration(self):
+        return self._decode()[2]
+
+    @property
+    def stream(self):
+        return self._decode()[3]
+
+    @property
+    def title(self):
+        return self._decode()[4]
+
+    @property
+    def uri(self):
+        return self._decode()[5]
+
+    @property
+    def is_seekable(self):
+        return not self.stream if self._is_seekable is None else self._is_seekable
+
+    @classmethod
+    def get(cls, track: dict):
+        """
+        Returns the shared record for the given track, creating it if necessary.
+        ----------
+        :param track:
+            A dict representing a track returned from Lavalink.
+        """
+        info = cls._cache.get(track['track'])
+
+        if info is None:
+            info = cls._cache[track['track']] = cls(track)
+
+        return info
+
+    @property
+    def size(self):
+        """ Returns the approximate amount of bytes used by this record. """
+        size = sys.getsizeof(self) + sys.getsizeof(self.track)
+
+        if self._fields is not None:
+            size += sys.getsizeof(self._fields) + sum(sys.getsizeof(field) for field in self._fields)
+
+        return size
+
+    @classmethod
+    def memory_report(cls):
+        """
+        Returns a dict describing the memory used by shared track information, and the approximate
+        amount of bytes saved compared to every AudioTrack keeping its own copy.
+        """
+        records = 0
+        references = 0
+        used = 0
+        saved = 0
+
+        for info in list(cls._cache.values()):
+            refs = sys.getrefcount(info) - 3  # The list, the loop variable and getrefcount's argument.
+            size = info.size
+            records += 1
+            references += refs
+            used += size
+            saved += max(refs - 1, 0) * size
+
+        return {'records': records, 'references': references, 'bytes_used': used, 'bytes_saved': saved}
+
+
 class AudioTrack:
-    __slots__ = ('track', 'identifier', 'is_seekable', 'author', 'duration', 'stream', 'title', 'uri', 'requester',
-                 'preferences')
+    __slots__ = ('_info', 'requester', '_preferences')
 
     def __init__(self, requester, **kwargs):
         self.requester = requester
-        self.preferences = kwargs
+        self._preferences = kwargs or None  # Most tracks have no preferences, so the dict is created on demand.
 
     @classmethod
     def build(cls, track, requester, **kwargs):
         """ Returns an optional AudioTrack. """
         new_track = cls(requester, **kwargs)
         try:
-            new_track.track = track['track']
-            new_track.identifier = track['info']['identifier']
-            new_track.is_seekable = track['info']['isSeekable']
-            new_track.author = track['info']['author']
-            new_track.duration = track['info']['length']
-            new_track.stream = track['info']['isStream']
-            new_track.title = track['info']['title']
-            new_track.uri = track['info']['uri']
-
+            new_track._info = TrackInfo.get(track)
             return new_track
-        except KeyError:
+        except (KeyError, TypeError):
             raise InvalidTrack('An invalid track was passed.')
 
+    @property
+    def preferences(self):
+        if self._preferences is None:
+            self._preferences = {}
+
+        return self._preferences
+
+    @property
+    def track(self):
+        return self._info.track
+
+    @property
+    def identifier(self):
+        return self._info.identifier
+
+    @property
+    def is_seekable(self):
+        return self._info.is_seekable
+
+    @property
+    def author(self):
+        return self._info.author
+
+    @property
+    def duration(self):
+        return self._info.duration
+
+    @property
+    def stream(self):
+        return self._info.stream
+
+    @property
+    def title(self):
+        return self._info.title
+
+    @property
+    def uri(self):
+        return self._info.uri
+
     def __repr__(self):
-        if not hasattr(self, 'track'):
+        if not hasattr(self, '_info'):
             raise TrackNotBuilt
         return '<AudioTrack title={0.title} identifier={0.identifier}>'.format(self)
 
 
+class LazyAudioTrack:
+    """
+    Represents a queue entry that is only resolved into an :class:`AudioTrack` shortly before it's needed.
+
+    Parameters
+    ----------
+    query: str
+        The query to resolve, e.g. ``ytsearch:never gonna give you up``.
+    requester: int
+        The ID of the user who requested the track.
+    """
+    __slots__ = ('query', 'requester', 'preferences', '_task')
+
+    def __init__(self, query: str, requester, **kwargs):
+        self.query = query
+        self.requester = requester
+        self.preferences = kwargs
+        self._task = None
+
+    @property
+    def resolving(self):
+        """ Returns whether a lookup for this entry has been started. """
+        return self._task is not None
+
+    def resolve(self, node: Node, guild_id: int = None):
+        """
+        Returns a future that resolves to an :class:`AudioTrack`, or ``None`` if the query had no results.
+        Lookups are shared, so calling this multiple times only queries Lavalink once.
+        If the lookup fails, the future raises its exception, and the next call starts a new lookup.
+        ----------
+        :param node:
+            The node to use for the lookup.
+        :param guild_id:
+            The guild the lookup is made for.
+        """
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._resolve(node, guild_id))
+
+        return self._task
+
+    async def _resolve(self, node: Node, guild_id: int):
+        try:
+            async with node._manager._lavalink._resolve_semaphore:
+                results = await node.get_tracks(self.query, guild_id)
+
+            if not isinstance(results, dict):  # get_tracks returns an empty list when the request fails.
+                raise NodeException('Node {} failed to load tracks'.format(node.name))
+        except Exception as e:
+            log.warning('Failed to resolve query {}: {}'.format(self.query, e))
+            self._task = None
+            raise
+
+        if not results.get('tracks'):
+            return None
+
+        return AudioTrack.build(results['tracks'][0], self.requester, **self.preferences)
+
+    def __repr__(self):
+        return '<LazyAudioTrack query={0.query}>'.format(self)
+
+
+class Queue(list):
+    """
+    A list of queue entries that keeps track of its total duration and can be searched by title and author.
+    Both are computed the first time they're used, and are then updated as the queue changes rather than
+    recalculated, so they stay cheap for very large queues.
+    """
+    _word = re.compile(r'\w+')
+
+    def __init__(self, entries=()):
+        super().__init__(entries)
+        self._duration = None
+        self._index = None  # word -> {id(entry): entry}
+        self._occurrences = None  # id(entry) -> how many times the entry is queued
+
+    @property
+    def duration(self):
+        """ Returns the total duration of the queued tracks in milliseconds. Streams and unresolved entries count as 0. """
+        if self._duration is None:
+            self._duration = sum(self._duration_of(entry) for entry in self)
+
+        return self._duration
+
+    @staticmethod
+    def _duration_of(entry):
+        if not isinstance(entry, AudioTrack) or entry.stream:
+            return 0
+
+        return entry.duration
+
+    def _words(self, entry):
+        if isinstance(entry, AudioTrack):
+            text = '{} {}'.format(entry.title, entry.author)
+        else:
+            text = getattr(entry, 'query', '')
+
+        return set(self._word.findall(text.lower()))
+
+    def _build_index(self):
+        self._index = {}
+        self._occurrences = {}
+
+        for entry in self:
+            self._index_entry(entry)
+
+    def _index_entry(self, entry):
+        key = id(entry)
+        self._occurrences[key] = self._occurrences.get(key, 0) + 1
+
+        if self._occurrences[key] == 1:
+            for word in self._words(entry):
+                self._index.setdefault(word, {})[key] = entry
+
+    def _unindex_entry(self, entry):
+        key = id(entry)
+        self._occurrences[key] -= 1
+
+        if self._occurrences[key] == 0:
+            del self._occurrences[key]
+
+            for word in self._words(entry):
+                entries = self._index[word]
+                del entries[key]
+
+                if not entries:
+                    del self._index[word]
+
+    def _added(self, entries):
+        for entry in entries:
+            if self._duration is not None:
+                self._duration += self._duration_of(entry)
+
+            if self._index is not None:
+                self._index_entry(entry)
+
+    def _removed(self, entries):
+        for entry in entries:
+            if self._duration is not None:
+                self._duration -= self._duration_of(entry)
+
+            if self._index is not None:
+                self._unindex_entry(entry)
+
+    def append(self, entry):
+        super().append(entry)
+        self._added((entry,))
+
+    def extend(self, entries):
+        entries = list(entries)
+        super().extend(entries)
+        self._added(entries)
+
+    def __iadd__(self, entries):
+        self.extend(entries)
+        return self
+
+    def __imul__(self, times):
+        if times <= 0:
+            self.clear()
+        else:
+            self.extend(list(self) * (times - 1))
+
+        return self
+
+    def insert(self, index, entry):
+        super().insert(index, entry)
+        self._added((entry,))
+
+    def pop(self, index=-1):
+        entry = super().pop(index)
+        self._removed((entry,))
+        return entry
+
+    def remove(self, entry):
+        super().remove(entry)
+        self._removed((entry,))
+
+    def clear(self):
+        super().clear()
+        self._duration = None
+        self._index = self._occurrences = None
+
+    def __setitem__(self, index, value):
+        removed = self[index] if isinstance(index, slice) else (self[index],)
+
+        if isinstance(index, slice):
+            value = list(value)
+
+        super().__setitem__(index, value)
+        self._added(value if isinstance(index, slice) else (value,))
+        self._removed(removed)
+
+    def __delitem__(self, index):
+        removed = self[index] if isinstance(index, slice) else (self[index],)
+        super().__delitem__(index)
+        self._removed(removed)
+
+    def search(self, query: str, limit: int = None):
+        """
+        Finds the queued entries whose title or author contains every word of the query.
+        Unresolved entries are matched against their query.
+        ----------
+        :param query:
+            The words to search for.
+        :param limit:
+            The maximum amount of results to return.
+
+        Returns
+        ---------
+        A list of ``(index, entry)`` tuples, in queue order.
+        """
+        words = set(self._word.findall(query.lower()))
+
+        if not words:
+            return []
+
+        if self._index is None:
+            self._build_index()
+
+        buckets = sorted((self._index.get(word, {}) for word in words), key=len)
+        matches = set(buckets[0])
+
+        for bucket in buckets[1:]:
+            matches.intersection_update(bucket)
+
+        results = []
+
+        if not matches:
+            return results
+
+        for index, entry in enumerate(self):
+            if id(entry) in matches:
+                results.append((index, entry))
+
+                if limit is not None and len(results) >= limit:
+                    break
+
+        return results
+
+    def dedupe(self):
+        """
+        Removes every track whose identifier is already queued earlier on. Unresolved entries are kept.
+
+        Returns
+        ---------
+        The amount of entries that were removed.
+        """
+        seen = set()
+        kept = []
+        removed = []
+
+        for entry in self:
+            identifier = getattr(entry, 'identifier', None)
+
+            if identifier is None or identifier not in seen:
+                seen.add(identifier)
+                kept.append(entry)
+            else:
+                removed.append(entry)
+
+        if removed:
+            super().__setitem__(slice(None), kept)
+            self._removed(removed)
+
+        return len(removed)
+
+    def page(self, page: int, per_page: int = 10):
+        """
+        Returns a view of a page of the queue, without copying it.
+        ----------
+        :param page:
+            The page to view, starting at 1.
+        :param per_page:
+            The amount of entries per page.
+        """
+        if per_page < 1:
+            raise ValueError('per_page must be at least 1')
+
+        start = (max(page, 1) - 1) * per_page
+        return QueueView(self, start, start + per_page)
+
+    def pages(self, per_page: int = 10):
+        """
+        Returns the amount of pages the queue spans.
+        ----------
+        :param per_page:
+            The amount of entries per page.
+        """
+        if per_page < 1:
+            raise ValueError('per_page must be at least 1')
+
+        return max((len(self) + per_page - 1) // per_page, 1)
+
+
+class QueueView(Sequence):
+    """
+    A read-only view of a range of a :class:`Queue`. The view reflects changes to the queue,
+    and :attr:`start` is the index of its first entry in the queue.
+    """
+    __slots__ = ('_queue', 'start', 'stop')
+
+    def __init__(self, queue: Queue, start: int, stop: int):
+        self._queue = queue
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return max(min(self.stop, len(self._queue)) - self.start, 0)
+
+    def __getitem__(self, index):
+        length = len(self)
+
+        if isinstance(index, slice):  # Slices are views too, unless they skip entries.
+            start, stop, step = index.indices(length)
+
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+
+            return QueueView(self._queue, self.start + start, self.start + max(stop, start))
+
+        if index < 0:
+            index += length
+
+        if not 0 <= index < length:
+            raise IndexError('view index out of range')
+
+        return self._queue[self.start + index]
+
+    @property
+    def duration(self):
+        """ Returns the total duration of the tracks in this view in milliseconds. """
+        return sum(Queue._duration_of(entry) for entry in self)
+
+    def __repr__(self):
+        return '<QueueView start={0.start} size={1}>'.format(self, len(self))
+
+
 class NoPreviousTrack(Exception):
     pass
 
@@ -55,8 +552,18 @@ class BasePlayer(ABC):
         self.guild_id = str(guild_id)
         self.node = node
         self._voice_state = {}
+        self._migrated_at = None
+        self._last_active = time()  # Used by the idle player reaper.
         self.channel_id = None
 
+        # How long each stage of the last voice connection took, in milliseconds. ``handshake`` is the time from the
+        # first voice event to both halves of the voice update arriving, ``confirm`` from sending the voice update to
+        # the first player update, and ``total`` the time from the first voice event to the first player update.
+        self.voice_timings = {}
+        self._voice_started_at = None
+        self._voice_sent_at = None
+        self._sent_voice_state = None
+
     @abstractmethod
     async def handle_event(self, event):
         raise NotImplementedError
@@ -69,6 +576,8 @@ class BasePlayer(ABC):
         pass
 
     async def _voice_server_update(self, data):
+        self._last_active = time()
+        self._voice_connecting()
         self._voice_state.update({
             'event': data
         })
@@ -76,6 +585,7 @@ class BasePlayer(ABC):
         await self._dispatch_voice_update()
 
     async def _voice_state_update(self, data):
+        self._last_active = time()
         self._voice_state.update({
             'sessionId': data['session_id']
         })
@@ -84,13 +594,53 @@ class BasePlayer(ABC):
 
         if not self.channel_id:  # We're disconnecting
             self._voice_state.clear()
+            self._sent_voice_state = None
+            self._voice_started_at = self._voice_sent_at = None
             return
 
+        self._voice_connecting()
         await self._dispatch_voice_update()
 
-    async def _dispatch_voice_update(self):
-        if {'sessionId', 'event'} == self._voice_state.keys():
-            await self.node._send(op='voiceUpdate', guildId=self.guild_id, **self._voice_state)
+    def _voice_connecting(self):
+        if self._voice_started_at is None:
+            self._voice_started_at = monotonic()
+
+    async def _dispatch_voice_update(self, force: bool = False):
+        """
+        Sends the voice update to the node once both halves have arrived.
+        Identical voice updates aren't sent again, unless ``force`` is given.
+        """
+        if {'sessionId', 'event'} != self._voice_state.keys():
+            return
+
+        if not force and self._voice_state == self._sent_voice_state:
+            log.debug('[NODE-{}] Skipping duplicate voice update for {}'.format(self.node.name, self.guild_id))
+
+            if self._voice_sent_at is None:  # e.g. a mute toggle, which doesn't start a connection.
+                self._voice_started_at = None
+
+            return
+
+        self._sent_voice_state = dict(self._voice_state)
+        await self.node._send(op='voiceUpdate', guildId=self.guild_id, **self._voice_state)
+
+        if self._voice_started_at is not None and self._voice_sent_at is None:
+            self._voice_sent_at = monotonic()
+            self._record_voice_timing('handshake', self._voice_sent_at - self._voice_started_at)
+
+    def _voice_confirmed(self):
+        """ Completes the voice connection timings once the node reports the player's state. """
+        if self._voice_sent_at is None:
+            return
+
+        now = monotonic()
+        self._record_voice_timing('confirm', now - self._voice_sent_at)
+        self._record_voice_timing('total', now - self._voice_started_at)
+        self._voice_started_at = self._voice_sent_at = None
+
+    def _record_voice_timing(self, stage: str, elapsed: float):
+        self.voice_timings[stage] = elapsed * 1000
+        self.node._manager._lavalink.players.voice_latency[stage].record(elapsed * 1000)
 
     @abstractmethod
     async def change_node(self, node: Node):
@@ -98,6 +648,8 @@ class BasePlayer(ABC):
 
 
 class DefaultPlayer(BasePlayer):
+    history_size = 10  # The default amount of played tracks each player remembers. See set_history_size.
+
     def __init__(self, guild_id: int, node: Node):
         super().__init__(guild_id, node)
 
@@ -107,13 +659,30 @@ class DefaultPlayer(BasePlayer):
         self.last_update = 0
         self.last_position = 0
         self.position_timestamp = 0
+        self._position_anchor = 0  # When last_position was taken. last_update is only set by the node.
         self.volume = 100
         self.shuffle = False
         self.repeat = False
         self.equalizer = [0.0 for x in range(15)]  # 0-14, -0.25 - 1.0
 
-        self.queue = []
+        self.prefetch = 3  # How many unresolved queue entries to look up ahead of playback.
+
+        # Whether to send the next track to Lavalink before the current one ends. Lavalink v3 can't pre-buffer a track,
+        # it stops the current one as soon as the next is played and only then loads it. This mode therefore trades
+        # clipping the end of each track for hiding some of that load time, and can't remove the silence entirely.
+        self.gapless = False
+        self.gapless_lead = 250  # How early (in ms) to send it. This adapts to the measured load time.
+        self.gapless_max_lead = 500  # The most (in ms) that may be clipped off the end of a track.
+        self.last_gap = None  # The silence (in ms) measured between the previous track stopping and the current one starting.
+
+        self.queue = Queue()
         self.current = None
+        self.history = deque(maxlen=self.history_size)  # The most recently played tracks, oldest first.
+
+        self._gapless_task = None
+        self._preempted = False
+        self._cut_at = None  # When the previous track stopped, for measuring the gap.
+        self._track_sent_at = 0
 
     @property
     def is_playing(self):
@@ -134,7 +703,7 @@ class DefaultPlayer(BasePlayer):
         if self.paused:
             return min(self.last_position, self.current.duration)
 
-        difference = time() * 1000 - self.last_update
+        difference = time() * 1000 - self._position_anchor
         return min(self.last_position + difference, self.current.duration)
 
     def store(self, key: object, value: object):
@@ -188,6 +757,55 @@ class DefaultPlayer(BasePlayer):
         else:
             self.queue.insert(index, AudioTrack.build(track, requester))
 
+    def add_query(self, requester: int, query: str, index: int = None, **kwargs):
+        """
+        Adds an unresolved query to the queue. The query is looked up in the background
+        once it's within :attr:`prefetch` entries of the front of the queue.
+        ----------
+        :param requester:
+            The ID of the user who requested the track.
+        :param query:
+            The query to resolve, e.g. ``ytsearch:never gonna give you up``.
+        :param index:
+            The index at which to add the query.
+            If index is left unspecified, the default behaviour is to append the query.
+        """
+        entry = LazyAudioTrack(query, requester, **kwargs)
+
+        if index is None:
+            self.queue.append(entry)
+        else:
+            self.queue.insert(index, entry)
+
+        self._prefetch()
+
+    def _prefetch(self):
+        """ Starts resolving the unresolved entries at the front of the queue. """
+        for entry in self.queue[:self.prefetch]:
+            if isinstance(entry, LazyAudioTrack) and not entry.resolving:
+                entry.resolve(self.node, self.guild_id).add_done_callback(partial(self._prefetched, entry))
+
+    def _prefetched(self, entry: LazyAudioTrack, future):
+        # Failed lookups leave the entry queued, to be retried by the next prefetch or when it's played.
+        if future.cancelled() or future.exception() is not None:
+            return
+
+        if self.node._manager._lavalink.players.get(int(self.guild_id)) is not self:  # The player was removed.
+            return
+
+        try:
+            index = self.queue.index(entry)
+        except ValueError:  # The entry was played or removed while it was being resolved.
+            return
+
+        track = future.result()
+
+        if track:
+            self.queue[index] = track
+        else:
+            del self.queue[index]
+            self._prefetch()
+
     async def play(self, track: AudioTrack = None, start_time: int = 0):
         """
         Plays the given track.
@@ -199,32 +817,83 @@ class DefaultPlayer(BasePlayer):
             Setting that determines the number of milliseconds to offset the track by.
             If left unspecified, it will start the track at its beginning.
         """
+        self._cancel_gapless()
+
         if self.repeat and self.current:
             self.queue.append(self.current)
 
+        if self.current:
+            self.history.append(self.current)
+
         self.current = None
         self.last_update = 0
         self.last_position = 0
         self.position_timestamp = 0
+        self._position_anchor = 0
         self.paused = False
 
-        if not track:
-            if not self.queue:
-                await self.stop()
-                await self.node._dispatch_event(QueueEndEvent(self))
-                return
+        while track is None or isinstance(track, LazyAudioTrack):
+            if track is None:
+                if not self.queue:
+                    await self.stop()
+                    await self.node._dispatch_event(QueueEndEvent(self))
+                    return
 
-            if self.shuffle:
-                track = self.queue.pop(randrange(len(self.queue)))
+                index = randrange(len(self.queue)) if self.shuffle else 0
+                track = self.queue.pop(index)
             else:
-                track = self.queue.pop(0)
+                index = None
+
+            if isinstance(track, LazyAudioTrack):
+                entry = track
+
+                try:
+                    track = await entry.resolve(self.node, self.guild_id)  # Entries without results are skipped.
+                except Exception:
+                    if index is not None:  # Put it back, so it isn't lost to a failed lookup.
+                        self.queue.insert(index, entry)
+                    raise
 
+        self._prefetch()
         self.current = track
+        self._track_sent_at = time() * 1000 - start_time
+        self._last_active = time()
         await self.node._send(op='play', guildId=self.guild_id, track=track.track, startTime=start_time)
         await self.node._dispatch_event(TrackStartEvent(self, track))
 
+    async def play_previous(self):
+        """
+        Plays the most recently played track again. The current track is put back at the front of the queue.
+        Raises :class:`NoPreviousTrack` if there's no history.
+        """
+        if not self.history:
+            raise NoPreviousTrack
+
+        track = self.history.pop()
+
+        if self.current:
+            self.queue.insert(0, self.current)
+            self.current = None  # So play() neither repeats it nor adds it to the history.
+
+        await self.play(track)
+
+    def set_history_size(self, size: int):
+        """
+        Sets how many played tracks this player remembers, keeping the most recent ones.
+        ----------
+        :param size:
+            The amount of tracks to remember. 0 disables the history.
+        """
+        self.history = deque(self.history, maxlen=size)
+
     async def stop(self):
         """ Stops the player. """
+        self._cancel_gapless()
+        self._cut_at = None
+
+        if self.current:
+            self.history.append(self.current)
+
         await self.node._send(op='stop', guildId=self.guild_id)
         await self.reset_equalizer()
         self.current = None
@@ -240,8 +909,18 @@ class DefaultPlayer(BasePlayer):
         :param pause:
             Whether to pause the player or not.
         """
+        self._cancel_gapless()
+        position = self.position
         await self.node._send(op='pause', guildId=self.guild_id, pause=pause)
         self.paused = pause
+        self._last_active = time()
+
+        if self.is_playing:  # Carry the position across the pause, as the next player update may be seconds away.
+            self.last_position = position
+            self._position_anchor = time() * 1000
+
+        if not pause:
+            self._arm_gapless()
 
     async def set_volume(self, vol: int):
         """
@@ -260,8 +939,16 @@ class DefaultPlayer(BasePlayer):
         :param position:
             The new position to seek to in milliseconds.
         """
+        self._cancel_gapless()
+        self._track_sent_at = time() * 1000 - position
         await self.node._send(op='seek', guildId=self.guild_id, position=position)
 
+        if self.is_playing:
+            self.last_position = position
+            self._position_anchor = time() * 1000
+
+        self._arm_gapless()
+
     async def set_gain(self, band: int, gain: float = 0.0):
         """
         Sets the equalizer band gain to the given amount.
@@ -303,19 +990,93 @@ class DefaultPlayer(BasePlayer):
 
     async def handle_event(self, event):
         """ Handles the given event as necessary. """
+        if isinstance(event, TrackEndEvent) and self._preempted:
+            # This is the end of the track that was replaced by a gapless transition.
+            self._preempted = False
+            return
+
         if isinstance(event, (TrackStuckEvent, TrackExceptionEvent)) or \
                 isinstance(event, TrackEndEvent) and event.reason == 'FINISHED':
+            if isinstance(event, TrackEndEvent):
+                self._cut_at = time() * 1000
+
             await self.play()
 
     async def update_state(self, state: dict):
-        self.last_update = time() * 1000
+        self._voice_confirmed()
+        self.last_update = self._position_anchor = time() * 1000
+
+        if not self.paused:
+            self._last_active = self.last_update / 1000
         self.last_position = state.get('position', 0)
         self.position_timestamp = state.get('time', 0)
 
+        # Updates that were sent before the current track started report a position
+        # greater than the time that has passed since we asked Lavalink to play it.
+        if self.last_position <= self.last_update - self._track_sent_at + 1000:
+            self._measure_gap()
+            self._arm_gapless()
+
         event = PlayerUpdateEvent(self, self.last_position, self.position_timestamp)
         await self.node._dispatch_event(event)
 
+    def _measure_gap(self):
+        """ Records the silence between the previous track stopping and the current one starting. """
+        if self._cut_at is None:
+            return
+
+        started_at = self.last_update - self.last_position
+        self.last_gap = started_at - self._cut_at
+        self._cut_at = None
+
+        if self.gapless:  # Move the lead towards the time the node needs to load a track, within the clipping limit.
+            self.gapless_lead = max(min((self.gapless_lead + self.last_gap) / 2, self.gapless_max_lead), 0)
+
+    def _arm_gapless(self):
+        """ Schedules the next track to be sent to Lavalink shortly before the current one ends. """
+        self._cancel_gapless()
+
+        if not self.gapless or self.paused or not self.is_playing or self.current.stream:
+            return
+
+        if not self.queue and not self.repeat:
+            return
+
+        remaining = self.current.duration - self.position
+
+        if remaining > 0:
+            self._gapless_task = asyncio.ensure_future(self._gapless_transition(remaining))
+
+    def _cancel_gapless(self):
+        if self._gapless_task is not None:
+            self._gapless_task.cancel()
+            self._gapless_task = None
+
+    async def _gapless_transition(self, remaining: float):
+        await asyncio.sleep(max(remaining - self.gapless_lead, 0) / 1000)
+        self._gapless_task = None
+
+        if self.node._manager._lavalink.players.get(int(self.guild_id)) is not self:  # The player was removed.
+            return
+
+        # Lavalink stops the current track once it receives the next one, which is after it's been written.
+        self._cut_at = time() * 1000 + self.node.send_latency.mean
+        self._preempted = True
+
+        try:
+            await self.play()
+        except Exception as e:  # pylint: disable=W0703
+            # The current track keeps playing, so let its end start the next one instead.
+            self._preempted = False
+            self._cut_at = None
+            log.warning('[NODE-{}] Gapless transition failed for player {}: {}'.format(self.node.name, self.guild_id, e))
+
+    def cleanup(self):
+        self._cancel_gapless()
+
     async def change_node(self, node: Node):
+        self._cancel_gapless()
+
         if self.node.available:
             await self.node._send(op='destroy', guildId=self.guild_id)
 
@@ -323,11 +1084,14 @@ class DefaultPlayer(BasePlayer):
         self.node = node
 
         if self._voice_state:
-            await self._dispatch_voice_update()
+            await self._dispatch_voice_update(force=True)
 
         if self.current:
-            await self.node._send(op='play', guildId=self.guild_id, track=self.current.track, startTime=self.position)
-            self.last_update = time() * 1000
+            position = self.position
+            self._track_sent_at = time() * 1000 - position
+            await self.node._send(op='play', guildId=self.guild_id, track=self.current.track, startTime=position)
+            self.last_position = position
+            self._position_anchor = time() * 1000
 
             if self.paused:
                 await self.node._send(op='pause', guildId=self.guild_id, pause=self.paused)
@@ -1,14 +1,54 @@
+import asyncio
 import logging
+import aiohttp
 from .websocket import WebSocket
 from .events import Event
 
 log = logging.getLogger('lavalink')
 
 
+class PoolSettings:
+    """
+    Settings for the HTTP connection pool that each node keeps for its REST and websocket traffic.
+
+    Parameters
+    ----------
+    limit: Optional[int]
+        The maximum amount of simultaneous connections to the node.
+    keepalive_timeout: Optional[float]
+        The amount of seconds to keep idle connections open for reuse.
+    dns_cache_ttl: Optional[int]
+        The amount of seconds to cache DNS lookups of the node's host for.
+    connect_timeout: Optional[float]
+        The maximum amount of seconds to wait for a connection to be established.
+    search_timeout: Optional[float]
+        The maximum amount of seconds a track search (``loadtracks``) may take.
+    decode_timeout: Optional[float]
+        The maximum amount of seconds a track decode may take.
+    """
+    def __init__(self, limit: int = 20, keepalive_timeout: float = 60, dns_cache_ttl: int = 300,
+                 connect_timeout: float = 10, search_timeout: float = 30, decode_timeout: float = 10):
+        self.limit = limit
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.connect_timeout = connect_timeout
+        self.search_timeout = search_timeout
+        self.decode_timeout = decode_timeout
+
+
 class Node:
     def __init__(self, manager, host: str, port: int, password: str,
-                 region: str, name: str, resume_key: str, resume_timeout: int):
+                 region: str, name: str, resume_key: str, resume_timeout: int, rate_limiter=None, capacity=None,
+                 pool_settings: PoolSettings = None):
         self._manager = manager
+        self.pool_settings = pool_settings = pool_settings or PoolSettings()
+
+        # Each node has its own pool, so a slow node can't use up connections the others need.
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=pool_settings.limit, keepalive_timeout=pool_settings.keepalive_timeout,
+                                           ttl_dns_cache=pool_settings.dns_cache_ttl, loop=manager._lavalink._loop),
+            timeout=aiohttp.ClientTimeout(total=30, sock_connect=pool_settings.connect_timeout)
+        )
         self._ws = WebSocket(self, host, port, password, resume_key, resume_timeout)
 
         self.host = host
@@ -17,6 +57,10 @@ class Node:
         self.region = region
         self.name = name or '{}-{}:{}'.format(self.region, self.host, self.port)
         self.stats = None
+        self.rate_limiter = rate_limiter
+        self.capacity = capacity
+        self.draining = False
+        self._pending_players = 0  # Players placed on this node since the last stats update.
 
     @property
     def available(self):
@@ -28,22 +72,123 @@ class Node:
         """ Returns a list of all players on this node. """
         return [p for p in self._manager._lavalink.players.values() if p.node == self]
 
+    @property
+    def pool_stats(self):
+        """ Returns a dict describing the usage of this node's HTTP connection pool. """
+        connector = self._session.connector
+        in_use = len(getattr(connector, '_acquired', ()))
+        idle = sum(len(conns) for conns in getattr(connector, '_conns', {}).values())
+        limit = connector.limit
+
+        return {
+            'limit': limit,
+            'in_use': in_use,
+            'idle': idle,
+            'utilisation': in_use / limit if limit else 0
+        }
+
+    @property
+    def send_queue_depth(self):
+        """ Returns the amount of payloads waiting to be sent to this node. """
+        return self._ws.send_queue_depth
+
+    @property
+    def send_latency(self):
+        """ Returns a :class:`Histogram` of the time (in ms) payloads spent queued before being sent. """
+        return self._ws.send_latency
+
+    @property
+    def over_capacity(self):
+        """ Returns whether the node has reached its configured capacity. """
+        if not self.capacity or not self.stats:
+            return False
+
+        return self.capacity.exceeded(self.stats, self._shared_stats()[1])
+
     @property
     def penalty(self):
-        """ Returns the load-balancing penalty for this node. """
+        """
+        Returns the load-balancing penalty for this node.
+        Players placed on the node since its last stats update count towards this.
+        """
         if not self.available or not self.stats:
             return 9e30
 
-        return self.stats.penalty.total
+        penalty, pending = self._shared_stats()
+        return penalty + pending
+
+    def _shared_stats(self):
+        """ Returns a tuple of (penalty, pending players), taking other processes into account if a coordinator is set. """
+        coordinator = self._manager.coordinator
+
+        if coordinator is not None:
+            shared = coordinator.get(self)
+
+            if shared is not None:
+                return shared
+
+        return self.stats.penalty.total, self._pending_players
+
+    def _player_placed(self):
+        self._pending_players += 1
+
+        if self._manager.coordinator is not None:
+            self._manager.coordinator.add_pending(self)
+
+    @property
+    def time_to_ready(self):
+        """ Returns the amount of seconds it took to first connect to this node, or ``None`` if it hasn't connected yet. """
+        return self._ws.time_to_ready
+
+    async def wait_until_ready(self):
+        """|coro|
+
+        Waits until the node is connected.
+        """
+        await self._ws._ready.wait()
+
+    async def close(self):
+        """|coro|
+
+        Closes the node's websocket without reconnecting, and its HTTP connection pool.
+        """
+        await self._ws.close()
+        await self._session.close()
+
+    async def warm_up(self, connections: int = 2):
+        """|coro|
+
+        Opens HTTP connections to the node ahead of time, so the first REST requests
+        don't have to wait for DNS lookups and connection setup.
+        ----------
+        :param connections:
+            The amount of keep-alive connections to open.
+        """
+        session = self._session
+        destination = 'http://{}:{}/version'.format(self.host, self.port)
+        headers = {
+            'Authorization': self.password
+        }
+
+        async def request():
+            try:
+                async with session.get(destination, headers=headers) as res:
+                    await res.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                log.debug('[NODE-{}] Failed to warm up connection: {}'.format(self.name, e))
+
+        await asyncio.gather(*(request() for _ in range(connections)))
 
-    async def get_tracks(self, query: str):
+    async def get_tracks(self, query: str, guild_id: int = None):
         """
         Gets all tracks associated with the given query.
         ----------
         :param query:
             The query to perform a search for.
+        :param guild_id:
+            The guild the search is made for. This is used to queue requests fairly when the node is rate limited.
         """
-        return await self._manager._lavalink.get_tracks(query, self)
+        return await self._manager._lavalink.get_tracks(query, self, guild_id)
 
     async def _dispatch_event(self, event: Event):
         """
@@ -1,6 +1,9 @@
+import asyncio
 import logging
+from collections import deque
+from time import monotonic
 from .node import Node
-from .events import NodeConnectedEvent, NodeDisconnectedEvent
+from .events import NodeConnectedEvent, NodeDisconnectedEvent, NodeDrainProgressEvent, NodeDrainedEvent
 
 log = logging.getLogger('lavalink')
 
@@ -9,8 +12,14 @@ class NodeManager:
     def __init__(self, lavalink, regions: dict):
         self._lavalink = lavalink
         self._player_queue = []
+        self._capacity_waiters = deque()
 
         self.nodes = []
+        self.rebalancers = []
+        self.coordinator = None  # A SharedNodeStats instance, to balance players across processes.
+
+        self.spill_over = True  # Place players in other regions when the regional nodes are over capacity.
+        self.reject_over_capacity = False  # Refuse to create players when every node is over capacity.
 
         self.regions = regions or {
             'asia': ('hongkong', 'singapore', 'sydney', 'japan', 'southafrica'),
@@ -30,7 +39,8 @@ class NodeManager:
         return [n for n in self.nodes if n.available]
 
     def add_node(self, host: str, port: int, password: str, region: str, name: str = None,
-                 resume_key: str = None, resume_timeout: int = 60):
+                 resume_key: str = None, resume_timeout: int = 60, rate_limiter=None, capacity=None,
+                 pool_settings=None):
         """
         Adds a node to your Lavalink server.
         ----------
@@ -48,18 +58,114 @@ class NodeManager:
             How long the node should wait for a connection while disconnected before clearing all players.
         :param name:
             An identifier for the node that will show in logs.
+        :param rate_limiter:
+            A :class:`RateLimiter` to apply to REST requests made to this node.
+        :param capacity:
+            The :class:`Capacity` at which the node should stop receiving new players.
+        :param pool_settings:
+            The :class:`PoolSettings` for the node's HTTP connection pool. Defaults to the client's.
         """
-        node = Node(self, host, port, password, region, name, resume_key, resume_timeout)
+        node = Node(self, host, port, password, region, name, resume_key, resume_timeout, rate_limiter, capacity,
+                    pool_settings or self._lavalink.pool_settings)
         self.nodes.append(node)
 
     def remove_node(self, node: Node):
         """
-        Removes a node.
+        Removes a node, and closes its connections.
         ----------
         :param node:
             The node to remove from the list.
+
+        Returns
+        ---------
+        An awaitable that completes once the node's connections are closed.
         """
         self.nodes.remove(node)
+        return asyncio.ensure_future(node.close())
+
+    def drain(self, node: Node, rate: float = 5, remove: bool = True):
+        """
+        Stops placing new players on the given node, and moves its players to the best
+        remaining nodes at a controlled rate. Idle and paused players are moved first.
+        :class:`NodeDrainProgressEvent` is dispatched for every player that is moved, and
+        :class:`NodeDrainedEvent` once the node is empty.
+        ----------
+        :param node:
+            The node to drain.
+        :param rate:
+            The maximum amount of players to move per second.
+        :param remove:
+            Whether to remove the node once it's empty.
+
+        Returns
+        ---------
+        An awaitable that completes once the node has no players left.
+        Cancelling it stops the drain and lets the node receive new players again.
+        """
+        node.draining = True
+        log.info('[NODE-{}] Draining {} players'.format(node.name, len(node.players)))
+        return asyncio.ensure_future(self._drain(node, rate, remove))
+
+    async def _drain(self, node: Node, rate: float, remove: bool):
+        moved = 0
+
+        try:
+            while True:
+                players = sorted(node.players, key=lambda p: getattr(p, 'is_playing', False) and not getattr(p, 'paused', False))
+
+                if not players:
+                    break
+
+                for index, player in enumerate(players, start=1):
+                    if player.node is not node:
+                        continue
+
+                    target = self.find_ideal_node(node.region)
+
+                    while not target:
+                        log.warning('[NODE-{}] No nodes available to drain to, retrying'.format(node.name))
+                        await asyncio.sleep(5)
+                        target = self.find_ideal_node(node.region)
+
+                    player._migrated_at = monotonic()
+                    target._player_placed()
+                    await player.change_node(target)
+                    moved += 1
+
+                    await self._lavalink._dispatch_event(NodeDrainProgressEvent(node, moved, len(players) - index))
+                    await asyncio.sleep(1 / rate)
+        except asyncio.CancelledError:
+            node.draining = False
+            raise
+
+        log.info('[NODE-{}] Drained, moved {} players'.format(node.name, moved))
+
+        if remove and node in self.nodes:
+            await self.remove_node(node)  # Otherwise it would keep reconnecting, and players could be placed on it again.
+
+        await self._lavalink._dispatch_event(NodeDrainedEvent(node))
+
+    def add_rebalancer(self, rebalancer):
+        """
+        Starts a rebalancer that periodically moves players between this manager's nodes.
+        ----------
+        :param rebalancer:
+            The :class:`Rebalancer` to start, e.g. :class:`FrameLossRebalancer`.
+        """
+        if rebalancer not in self.rebalancers:
+            self.rebalancers.append(rebalancer)
+            rebalancer.start(self)
+
+    def remove_rebalancer(self, rebalancer):
+        """
+        Stops a rebalancer.
+        ----------
+        :param rebalancer:
+            The :class:`Rebalancer` to stop.
+        """
+        if rebalancer in self.rebalancers:
+            self.rebalancers.remove(rebalancer)
+            rebalancer.stop()
 
     def get_region(self, endpoint: str):
         """
@@ -87,23 +193,64 @@ class NodeManager:
     def find_ideal_node(self, region: str = None):
         """
         Finds the best (least used) node in the given region, if applicable.
+        Nodes that are over capacity are only returned if every node is over capacity,
+        and draining nodes are never returned.
         ----------
         :param region:
             The region to find a node in.
         """
+        available = [n for n in self.available_nodes if not n.draining]
         nodes = None
         if region:
-            nodes = [n for n in self.available_nodes if n.region == region]
+            nodes = [n for n in available if n.region == region]
 
         if not nodes:  # If there are no regional nodes available, or a region wasn't specified.
-            nodes = self.available_nodes
+            nodes = available
 
         if not nodes:
             return None
 
-        best_node = min(nodes, key=lambda node: node.penalty)
+        accepting = [n for n in nodes if not n.over_capacity]
+
+        if not accepting and self.spill_over:
+            accepting = [n for n in available if not n.over_capacity]
+
+        best_node = min(accepting or nodes, key=lambda node: node.penalty)
         return best_node
 
+    async def wait_for_capacity(self, timeout: float = None):
+        """|coro|
+
+        Waits until the next stats update that leaves a node with spare capacity.
+        Waiters are woken in the order they started waiting.
+        ----------
+        :param timeout:
+            The maximum amount of seconds to wait. ``None`` means wait forever.
+        """
+        future = asyncio.get_event_loop().create_future()
+        self._capacity_waiters.append(future)
+
+        try:
+            await asyncio.wait_for(future, timeout)
+        finally:
+            if future in self._capacity_waiters:
+                self._capacity_waiters.remove(future)
+
+    def _stats_updated(self, node: Node):
+        node._pending_players = 0
+
+        if self.coordinator is not None:
+            self.coordinator.publish(node)
+
+        if node.over_capacity:
+            return
+
+        while self._capacity_waiters:
+            future = self._capacity_waiters.popleft()
+
+            if not future.done():
+                future.set_result(node)
+
     async def _node_connect(self, node: Node):
         log.info('[NODE-{}] Successfully established connection'.format(node.name))
 
@@ -113,10 +260,17 @@ class NodeManager:
         self._player_queue.clear()
         await self._lavalink._dispatch_event(NodeConnectedEvent(node))
 
-    async def _node_disconnect(self, node: Node, code: int, reason: str):
+    async def _node_disconnect(self, node: Node, code: int, reason: str, resuming: bool = False):
         log.warning('[NODE-{}] Disconnected with code {} and reason {}'.format(node.name, code, reason))
         await self._lavalink._dispatch_event(NodeDisconnectedEvent(node, code, reason))
 
+        if resuming:  # Players are kept on the node unless the session can't be resumed.
+            log.info('[NODE-{}] Waiting for the session to be resumed'.format(node.name))
+            return
+
+        await self._move_players(node)
+
+    async def _move_players(self, node: Node):
         best_node = self.find_ideal_node(node.region)
 
         if not best_node:
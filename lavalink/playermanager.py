@@ -1,6 +1,38 @@
+import asyncio
+import logging
+from time import monotonic, time
 from .node import Node
 from .models import BasePlayer
-from .exceptions import NodeException
+from .events import PlayerEvictedEvent
+from .exceptions import NodeException, NodeCapacityExceeded
+from .metrics import Histogram
+from .watchdog import Watchdog
+
+log = logging.getLogger('lavalink')
+
+
+class BulkResult:
+    """
+    The outcome of :func:`PlayerManager.bulk`.
+
+    Parameters
+    ----------
+    results: dict
+        A dict of player -> the value returned by the operation, for players that succeeded.
+    errors: dict
+        A dict of player -> the exception raised, for players that failed.
+    """
+    def __init__(self, results: dict, errors: dict):
+        self.results = results
+        self.errors = errors
+
+    @property
+    def ok(self):
+        """ Returns whether the operation succeeded for every player. """
+        return not self.errors
+
+    def __repr__(self):
+        return '<BulkResult succeeded={} failed={}>'.format(len(self.results), len(self.errors))
 
 
 class PlayerManager:
@@ -12,6 +44,14 @@ class PlayerManager:
         self.players = {}
         self.default_player = player
 
+        self._shards = {}  # shard_id -> {guild_id: player}
+
+        self._reaper = None
+        self.watchdog = None
+
+        # The time taken by each stage of establishing voice connections, across all players. See BasePlayer.voice_timings.
+        self.voice_latency = {stage: Histogram() for stage in ('handshake', 'confirm', 'total')}
+
     def __len__(self):
         return len(self.players)
 
@@ -36,11 +76,245 @@ class PlayerManager:
         if guild_id not in self.players:
             return
 
-        player = self.players.pop(guild_id)
+        await self._destroy(guild_id)
+        self._lavalink._remove_guild_subscriptions(guild_id)
+
+    async def _destroy(self, guild_id: int):
+        player = self._pop(guild_id)
+        player.cleanup()
 
         if player.node and player.node.available:
             await player.node._send(op='destroy', guildId=player.guild_id)
 
+        return player
+
+    def start_reaper(self, ttl: float = 600, interval: float = 60, max_players: int = None, max_queued_tracks: int = None):
+        """
+        Starts a background task that destroys players that have been idle for too long.
+        A player is idle while it's disconnected, not playing or paused. Players that are
+        playing are never evicted. :class:`PlayerEvictedEvent` is dispatched for every evicted player.
+        ----------
+        :param ttl:
+            The amount of seconds a player may be idle before it's evicted.
+        :param interval:
+            The amount of seconds between checks.
+        :param max_players:
+            The maximum amount of players to keep. Idle players are evicted least recently used first to stay under it.
+        :param max_queued_tracks:
+            The maximum amount of tracks queued across all players. Idle players are evicted least recently used
+            first to stay under it.
+        """
+        self.stop_reaper()
+        self._reaper = asyncio.ensure_future(self._reap_loop(ttl, interval, max_players, max_queued_tracks))
+
+    def stop_reaper(self):
+        """ Stops the idle player reaper, if it's running. """
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+
+    def start_watchdog(self, watchdog: Watchdog = None):
+        """
+        Starts a watchdog that recovers players which have stopped receiving updates from their node.
+        ----------
+        :param watchdog:
+            The :class:`Watchdog` to start. A watchdog with the default settings is used if this isn't given.
+        """
+        self.stop_watchdog()
+        self.watchdog = watchdog or Watchdog()
+        self.watchdog.start(self)
+        return self.watchdog
+
+    def stop_watchdog(self):
+        """ Stops the watchdog, if it's running. """
+        if self.watchdog is not None:
+            self.watchdog.stop()
+            self.watchdog = None
+
+    async def _reap_loop(self, ttl: float, interval: float, max_players: int, max_queued_tracks: int):
+        while True:
+            await asyncio.sleep(interval)
+
+            try:
+                await self.reap(ttl, max_players, max_queued_tracks)
+            except Exception as e:  # pylint: disable=W0703
+                log.warning('Idle player reaper encountered an exception! {}'.format(e))
+
+    async def reap(self, ttl: float, max_players: int = None, max_queued_tracks: int = None):
+        """|coro|
+
+        Evicts idle players once. See :func:`start_reaper` for the parameters.
+        """
+        now = time()
+        idle = sorted((item for item in self.players.items() if self._is_idle(item[1])), key=lambda item: item[1]._last_active)
+        evicted = 0
+
+        for guild_id, player in idle:
+            if now - player._last_active > ttl:
+                await self._evict(guild_id, player, 'idle')
+                evicted += 1
+
+        idle = idle[evicted:]
+
+        if max_players is not None:
+            while idle and len(self.players) > max_players:
+                await self._evict(*idle.pop(0), 'max_players')
+
+        if max_queued_tracks is not None:
+            queued = sum(len(getattr(p, 'queue', ())) for p in self.players.values())
+
+            while idle and queued > max_queued_tracks:
+                guild_id, player = idle.pop(0)
+                queued -= len(getattr(player, 'queue', ()))
+                await self._evict(guild_id, player, 'max_queued_tracks')
+
+    @staticmethod
+    def _is_idle(player):
+        return not getattr(player, 'is_playing', False) or getattr(player, 'paused', False)
+
+    async def _evict(self, guild_id: int, player, reason: str):
+        log.debug('Evicting player for guild {} ({})'.format(guild_id, reason))
+        await self._destroy(guild_id)
+        await self._lavalink._dispatch_event(PlayerEvictedEvent(player, reason))
+        self._lavalink._remove_guild_subscriptions(guild_id)
+
+    def _add(self, guild_id: int, player):
+        self.players[guild_id] = player
+        self._shards.setdefault(self.get_shard_id(guild_id), {})[guild_id] = player
+        return player
+
+    def _pop(self, guild_id: int):
+        player = self.players.pop(guild_id)
+        shard_id = self.get_shard_id(guild_id)
+        shard = self._shards.get(shard_id)
+
+        if shard is not None:
+            shard.pop(guild_id, None)
+
+            if not shard:
+                del self._shards[shard_id]
+
+        return player
+
+    def get_shard_id(self, guild_id: int):
+        """
+        Returns the ID of the shard that the given guild belongs to.
+        ----------
+        :param guild_id:
+            The guild_id to get the shard of.
+        """
+        return (int(guild_id) >> 22) % int(self._lavalink._shard_count)
+
+    def shard_players(self, shard_id: int):
+        """
+        Returns a list of the players belonging to the given shard.
+        ----------
+        :param shard_id:
+            The ID of the shard.
+        """
+        return list(self._shards.get(shard_id, {}).values())
+
+    async def pause_shard(self, shard_id: int, pause: bool = True):
+        """|coro|
+
+        Sets the paused state of every player on the given shard.
+        ----------
+        :param shard_id:
+            The ID of the shard.
+        :param pause:
+            Whether to pause the players or not.
+        """
+        players = [p for p in self.shard_players(shard_id) if hasattr(p, 'set_pause')]
+        return await self.bulk(players, 'set_pause', pause)
+
+    async def update_voice_shard(self, shard_id: int):
+        """|coro|
+
+        Re-sends the voice state of every player on the given shard to Lavalink,
+        e.g. after the shard has reconnected.
+        ----------
+        :param shard_id:
+            The ID of the shard.
+        """
+        return await self.bulk(self.shard_players(shard_id), '_dispatch_voice_update', force=True)
+
+    async def destroy_shard(self, shard_id: int):
+        """|coro|
+
+        Destroys every player on the given shard. See :func:`destroy`.
+        ----------
+        :param shard_id:
+            The ID of the shard.
+        """
+        guild_ids = {player: guild_id for guild_id, player in self._shards.get(shard_id, {}).items()}
+        return await self.bulk(guild_ids, lambda p: self.destroy(guild_ids[p]))
+
+    async def bulk(self, players, operation, *args, **kwargs):
+        """|coro|
+
+        Runs an operation for many players at once. Players are grouped by node, and the
+        payloads they send are written to each node's websocket in a single batch instead
+        of being awaited one by one. Payloads for players outside the operation aren't held back.
+        A player only succeeds once all of its payloads have been written to its node.
+        ----------
+        :param players:
+            An iterable of the players to run the operation for.
+        :param operation:
+            Either the name of a player coroutine method, e.g. ``'set_volume'``,
+            or a coroutine function that takes the player as its first argument.
+        :param args:
+            Additional positional arguments to pass to the operation.
+        :param kwargs:
+            Additional keyword arguments to pass to the operation.
+
+        Returns
+        ---------
+        A :class:`BulkResult` with the results and errors per player.
+        """
+        players = list(players)
+        by_node = {}
+
+        for player in players:
+            by_node.setdefault(player.node, []).append(player)
+
+        for node, node_players in by_node.items():
+            node._ws._start_batch([p.guild_id for p in node_players])
+
+        try:
+            outcomes = await asyncio.gather(*(self._run_operation(p, operation, args, kwargs) for p in players),
+                                            return_exceptions=True)
+        finally:
+            flushes = await asyncio.gather(*(node._ws._flush_batch([p.guild_id for p in node_players])
+                                             for node, node_players in by_node.items()), return_exceptions=True)
+
+        results = {}
+        errors = {}
+
+        for player, outcome in zip(players, outcomes):
+            if isinstance(outcome, Exception):
+                errors[player] = outcome
+            else:
+                results[player] = outcome
+
+        for (node, node_players), failed in zip(by_node.items(), flushes):
+            if isinstance(failed, Exception):  # Nothing was confirmed for this node, so every player on it failed.
+                log.warning('[NODE-{}] Failed to send batch: {}'.format(node.name, failed))
+                failed = {player.guild_id: failed for player in node_players}
+
+            for player in node_players:
+                if player.guild_id in failed:
+                    results.pop(player, None)
+                    errors.setdefault(player, failed[player.guild_id])
+
+        return BulkResult(results, errors)
+
+    @staticmethod
+    async def _run_operation(player, operation, args, kwargs):
+        if isinstance(operation, str):
+            return await getattr(player, operation)(*args, **kwargs)
+
+        return await operation(player, *args, **kwargs)
+
     def values(self):
         """ Returns an iterator that yields only values. """
         for player in self.players.values():
@@ -56,8 +330,9 @@ class PlayerManager:
     def remove(self, guild_id: int):
         """ Removes a player from the internal cache. """
         if guild_id in self.players:
-            player = self.players.pop(guild_id)
+            player = self._pop(guild_id)
             player.cleanup()
+            self._lavalink._remove_guild_subscriptions(guild_id)
 
     def get(self, guild_id: int):
         """
@@ -100,10 +375,56 @@ class PlayerManager:
         if endpoint:
             region = self._lavalink.node_manager.get_region(endpoint)
 
-        node = self._lavalink.node_manager.find_ideal_node(region)
+        node_manager = self._lavalink.node_manager
+        node = node_manager.find_ideal_node(region)
 
         if not node:
             raise NodeException('No available nodes!')
 
-        self.players[guild_id] = player = self.default_player(guild_id, node)
+        if node.over_capacity and node_manager.reject_over_capacity:
+            raise NodeCapacityExceeded('All nodes are over capacity!')
+
+        node._player_placed()
+        player = self._add(guild_id, self.default_player(guild_id, node))
         return player
+
+    async def create_when_available(self, guild_id: int, region: str = 'eu', endpoint: str = None, timeout: float = 30):
+        """|coro|
+
+        Creates a player like :func:`create`, but waits for a node to have spare capacity
+        if every node is currently over capacity.
+        ----------
+        :param guild_id:
+            The guild_id to associate with the player.
+        :param region:
+            The region to use when selecting a Lavalink node.
+        :param endpoint:
+            The address of the Discord voice server.
+        :param timeout:
+            The maximum amount of seconds to wait for capacity before raising :class:`NodeCapacityExceeded`.
+        """
+        node_manager = self._lavalink.node_manager
+        deadline = monotonic() + timeout
+
+        while True:
+            if guild_id in self.players:
+                return self.players[guild_id]
+
+            if endpoint:
+                region = node_manager.get_region(endpoint)
+
+            node = node_manager.find_ideal_node(region)
+
+            if node and not node.over_capacity:
+                node._player_placed()
+                return self._add(guild_id, self.default_player(guild_id, node))
+
+            remaining = deadline - monotonic()
+
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+
+                await node_manager.wait_for_capacity(remaining)
+            except asyncio.TimeoutError:
+                raise NodeCapacityExceeded('Timed out waiting for a node with spare capacity!')
@@ -0,0 +1,115 @@
+import asyncio
+from collections import OrderedDict, deque
+from time import monotonic
+
+from .exceptions import RateLimitExceeded
+
+
+class RateLimiter:
+    """
+    A token-bucket rate limiter for a node's REST requests.
+
+    Requests that can't be made straight away are queued per guild and released
+    round-robin, so one busy guild can't starve the others. Requests that would have
+    to wait longer than their deadline are rejected with :class:`RateLimitExceeded`
+    instead of piling up.
+
+    Parameters
+    ----------
+    rate: float
+        The amount of requests allowed per second.
+    burst: Optional[int]
+        The amount of requests that can be made at once after a quiet period. Defaults to ``rate``.
+    max_wait: Optional[float]
+        The default amount of seconds a request may wait for its turn.
+    max_queued: Optional[int]
+        The maximum amount of requests that may wait for their turn. ``None`` means no limit.
+    """
+    def __init__(self, rate: float, burst: int = None, max_wait: float = 5.0, max_queued: int = None):
+        self.rate = rate
+        self.burst = burst or max(int(rate), 1)
+        self.max_wait = max_wait
+        self.max_queued = max_queued
+        self.rejected = 0
+
+        self._tokens = self.burst
+        self._last_refill = monotonic()
+        self._queues = OrderedDict()
+        self._queued = 0
+        self._releaser = None
+
+    @property
+    def queued(self):
+        """ Returns the amount of requests waiting for their turn. """
+        return self._queued
+
+    def _refill(self):
+        now = monotonic()
+        self._tokens = min(self._tokens + (now - self._last_refill) * self.rate, self.burst)
+        self._last_refill = now
+
+    def _reject(self, future=None):
+        self.rejected += 1
+        exc = RateLimitExceeded('Request would exceed the rate limit of {} requests per second'.format(self.rate))
+
+        if future is None:
+            raise exc
+
+        future.set_exception(exc)
+
+    async def acquire(self, key=None, timeout: float = None):
+        """|coro|
+
+        Waits until a request may be made.
+        ----------
+        :param key:
+            The key to queue the request under, usually a guild ID. Requests are released round-robin across keys.
+        :param timeout:
+            The maximum amount of seconds to wait. Defaults to :attr:`max_wait`.
+        """
+        timeout = self.max_wait if timeout is None else timeout
+        self._refill()
+
+        if not self._queued and self._tokens >= 1:
+            self._tokens -= 1
+            return
+
+        # Every request that's already waiting needs a token before this one can be released.
+        expected_wait = (self._queued + 1 - self._tokens) / self.rate
+
+        if expected_wait > timeout or (self.max_queued is not None and self._queued >= self.max_queued):
+            self._reject()
+
+        future = asyncio.get_event_loop().create_future()
+        self._queues.setdefault(key, deque()).append((future, monotonic() + timeout))
+        self._queued += 1
+
+        if self._releaser is None or self._releaser.done():
+            self._releaser = asyncio.ensure_future(self._release())
+
+        await future
+
+    async def _release(self):
+        while self._queues:
+            self._refill()
+
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                continue
+
+            key, queue = self._queues.popitem(last=False)
+            future, deadline = queue.popleft()
+            self._queued -= 1
+
+            if queue:  # Move the key to the back of the line.
+                self._queues[key] = queue
+
+            if future.done():  # The waiter was cancelled.
+                continue
+
+            if monotonic() > deadline:
+                self._reject(future)
+                continue
+
+            self._tokens -= 1
+            future.set_result(None)
@@ -0,0 +1,247 @@
+import asyncio
+import logging
+from time import monotonic
+
+log = logging.getLogger('lavalink')
+
+
+class Rebalancer:
+    """
+    The base for background tasks that move players between nodes.
+    Rebalancers are started with :func:`NodeManager.add_rebalancer`.
+
+    Parameters
+    ----------
+    interval: float
+        The amount of seconds between checks.
+    moves_per_interval: int
+        The maximum amount of players to move per check.
+    cooldown: float
+        The amount of seconds a player has to stay on a node after being moved, before it may be moved again.
+    """
+    def __init__(self, interval: float, moves_per_interval: int, cooldown: float):
+        self.interval = interval
+        self.moves_per_interval = moves_per_interval
+        self.cooldown = cooldown
+        self.moved = 0
+
+        self._manager = None
+        self._task = None
+
+    @property
+    def running(self):
+        """ Returns whether the rebalancer is running. """
+        return self._task is not None and not self._task.done()
+
+    def start(self, manager):
+        """
+        Starts checking the nodes of the given manager periodically.
+        ----------
+        :param manager:
+            The :class:`NodeManager` to rebalance.
+        """
+        self._manager = manager
+
+        if not self.running:
+            self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        """ Stops the rebalancer. """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+
+            try:
+                await self.rebalance()
+            except Exception as e:  # pylint: disable=W0703
+                log.warning('{} encountered an exception! {}'.format(type(self).__name__, e))
+
+    async def rebalance(self):
+        """|coro|
+
+        Performs a single check, moving players as necessary.
+        """
+        raise NotImplementedError
+
+    def _movable(self, player):
+        return player._migrated_at is None or monotonic() - player._migrated_at >= self.cooldown
+
+    def _targets(self, source):
+        return [n for n in self._manager.available_nodes if n is not source and not n.over_capacity and not n.draining]
+
+    async def _move(self, player, node):
+        log.debug('[NODE-{}] Rebalancing {} to {}'.format(player.node.name, player.guild_id, node.name))
+        player._migrated_at = monotonic()
+        node._player_placed()
+        self.moved += 1
+        await player.change_node(node)
+
+
+class FrameLossRebalancer(Rebalancer):
+    """
+    Moves players away from nodes whose frame loss keeps rising.
+
+    The loss of each node is smoothed across stats updates. A node becomes unhealthy once the
+    smoothed loss reaches ``unhealthy_loss``, and only becomes healthy again once it falls below
+    ``healthy_loss``, so nodes near the threshold don't flip back and forth. Players are moved
+    off unhealthy nodes a few at a time, idle players first.
+
+    Parameters
+    ----------
+    interval: Optional[float]
+        The amount of seconds between checks.
+    moves_per_interval: Optional[int]
+        The maximum amount of players to move per check.
+    cooldown: Optional[float]
+        The amount of seconds a player has to stay on a node after being moved.
+    unhealthy_loss: Optional[float]
+        The fraction of frames lost (nulled or deficit) at which a node is considered unhealthy.
+    healthy_loss: Optional[float]
+        The fraction of frames lost below which an unhealthy node is considered healthy again.
+    smoothing: Optional[float]
+        How much weight a new stats update has in the smoothed loss, between 0 and 1.
+    """
+    def __init__(self, interval: float = 30, moves_per_interval: int = 5, cooldown: float = 300,
+                 unhealthy_loss: float = 0.02, healthy_loss: float = 0.005, smoothing: float = 0.5):
+        super().__init__(interval, moves_per_interval, cooldown)
+        self.unhealthy_loss = unhealthy_loss
+        self.healthy_loss = healthy_loss
+        self.smoothing = smoothing
+
+        self.unhealthy = set()
+        self.loss = {}
+        self._seen = {}
+
+    def _observe(self):
+        nodes = self._manager.nodes
+
+        for node in list(self.loss):
+            if node not in nodes:
+                self.loss.pop(node)
+                self._seen.pop(node, None)
+                self.unhealthy.discard(node)
+
+        for node in nodes:
+            stats = node.stats
+
+            if not stats or self._seen.get(node) is stats:
+                continue
+
+            self._seen[node] = stats
+            lost = (max(stats.frames_nulled, 0) + max(stats.frames_deficit, 0)) / 3000  # 3000 frames per minute.
+            loss = self.loss.get(node)
+            self.loss[node] = loss = lost if loss is None else loss + (lost - loss) * self.smoothing
+
+            if node in self.unhealthy and loss <= self.healthy_loss:
+                self.unhealthy.discard(node)
+                log.info('[NODE-{}] Frame loss recovered ({:.2%})'.format(node.name, loss))
+            elif node not in self.unhealthy and loss >= self.unhealthy_loss:
+                self.unhealthy.add(node)
+                log.warning('[NODE-{}] Frame loss is rising ({:.2%}), moving players away'.format(node.name, loss))
+
+    async def rebalance(self):
+        self._observe()
+        budget = self.moves_per_interval
+
+        for node in sorted(self.unhealthy, key=lambda n: self.loss[n], reverse=True):
+            if budget <= 0:
+                break
+
+            if not node.available:  # Players are moved by the disconnect handler.
+                continue
+
+            targets = [n for n in self._targets(node) if n not in self.unhealthy and self.loss.get(n, 0) < self.loss[node]]
+
+            if not targets:
+                continue
+
+            players = sorted((p for p in node.players if self._movable(p)),
+                             key=lambda p: getattr(p, 'is_playing', False) and not getattr(p, 'paused', False))
+
+            for player in players[:budget]:
+                regional = [n for n in targets if n.region == node.region]
+                await self._move(player, min(regional or targets, key=lambda n: n.penalty))
+                budget -= 1
+
+
+class LoadRebalancer(Rebalancer):
+    """
+    Evens out skewed load between nodes, for example after failovers and restarts.
+
+    When the node with the most players has more than ``threshold`` times the players of the
+    one with the least, players are moved from the former to the latter. Player counts are
+    compared rather than penalties, as the players that are moved don't count towards a
+    penalty. Only players that aren't actively playing are moved, so playback is never
+    interrupted; players between tracks are preferred over paused ones.
+
+    Parameters
+    ----------
+    interval: Optional[float]
+        The amount of seconds between checks.
+    moves_per_interval: Optional[int]
+        The maximum amount of players to move per check.
+    cooldown: Optional[float]
+        The amount of seconds a player has to stay on a node after being moved.
+    threshold: Optional[float]
+        The ratio between the highest and lowest load at which load is considered skewed.
+    same_region: Optional[bool]
+        Whether to only balance nodes within the same region.
+    """
+    def __init__(self, interval: float = 300, moves_per_interval: int = 10, cooldown: float = 600,
+                 threshold: float = 1.5, same_region: bool = True):
+        super().__init__(interval, moves_per_interval, cooldown)
+        self.threshold = threshold
+        self.same_region = same_region
+
+    @staticmethod
+    def _idle_rank(player):
+        """ Returns 0 for players between tracks, 1 for paused players and ``None`` for players that are playing. """
+        if getattr(player, 'current', None) is None or not getattr(player, 'is_connected', True):
+            return 0
+
+        if getattr(player, 'paused', False):
+            return 1
+
+        return None
+
+    async def rebalance(self):
+        groups = {}
+
+        for node in self._manager.available_nodes:
+            if not node.draining:
+                groups.setdefault(node.region if self.same_region else None, []).append(node)
+
+        budget = self.moves_per_interval
+
+        for nodes in groups.values():
+            if len(nodes) < 2:
+                continue
+
+            loads = {n: len(n.players) for n in nodes}
+            heaviest = max(nodes, key=loads.get)
+            candidates = sorted((p for p in heaviest.players if self._movable(p) and self._idle_rank(p) is not None),
+                                key=self._idle_rank)
+
+            for player in candidates:
+                targets = [n for n in nodes if n is not heaviest and not n.over_capacity]
+
+                if budget <= 0:
+                    return
+
+                if not targets:
+                    break
+
+                lightest = min(targets, key=loads.get)
+
+                # Stop once moving another player would no longer reduce the skew.
+                if loads[heaviest] <= max(loads[lightest], 1) * self.threshold or loads[heaviest] - loads[lightest] < 2:
+                    break
+
+                await self._move(player, lightest)
+                loads[heaviest] -= 1
+                loads[lightest] += 1
+                budget -= 1
@@ -40,3 +40,40 @@ class Stats:
         self.frames_nulled = frame_stats.get('nulled', -1)
         self.frames_deficit = frame_stats.get('deficit', -1)
         self.penalty = Penalty(self)
+
+
+class Capacity:
+    """
+    Describes how much load a node can take before it should stop receiving new players.
+    Limits that are left unspecified aren't checked.
+
+    Parameters
+    ----------
+    max_playing_players: Optional[int]
+        The maximum amount of players that are playing a track.
+    max_system_load: Optional[float]
+        The maximum system CPU load, between 0 and 1.
+    max_deficit_frames: Optional[int]
+        The maximum amount of deficit frames per minute.
+    """
+    def __init__(self, max_playing_players: int = None, max_system_load: float = None, max_deficit_frames: int = None):
+        self.max_playing_players = max_playing_players
+        self.max_system_load = max_system_load
+        self.max_deficit_frames = max_deficit_frames
+
+    def exceeded(self, stats: Stats, pending_players: int = 0):
+        """
+        Returns whether the given stats exceed this capacity.
+        ----------
+        :param stats:
+            The stats of the node.
+        :param pending_players:
+            The amount of players placed on the node since the stats were received.
+        """
+        if self.max_playing_players is not None and stats.playing_players + pending_players >= self.max_playing_players:
+            return True
+
+        if self.max_system_load is not None and stats.system_load >= self.max_system_load:
+            return True
+
+        return self.max_deficit_frames is not None and stats.frames_deficit >= self.max_deficit_frames
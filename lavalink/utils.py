@@ -1,3 +1,7 @@
+import struct
+from base64 import b64decode
+
+
 def format_time(time):
     """
     Formats the given time into HH:MM:SS.
@@ -24,3 +28,91 @@ def parse_time(time):
     minutes, seconds = divmod(remainder, 60)
 
     return days, hours, minutes, seconds
+
+
+class _DataReader:
+    """ Reads values written by Java's DataOutput, which Lavaplayer uses to encode tracks. """
+    def __init__(self, data: bytes):
+        self._data = data
+        self._position = 0
+
+    def _read(self, count: int):
+        end = self._position + count
+
+        if end > len(self._data):
+            raise ValueError('Unexpected end of track data')
+
+        chunk = self._data[self._position:end]
+        self._position = end
+        return chunk
+
+    def read_byte(self):
+        return self._read(1)[0]
+
+    def read_boolean(self):
+        return self.read_byte() != 0
+
+    def read_int(self):
+        return struct.unpack('>i', self._read(4))[0]
+
+    def read_long(self):
+        return struct.unpack('>q', self._read(8))[0]
+
+    def read_utf(self):
+        length = struct.unpack('>H', self._read(2))[0]
+        # Java writes "modified" UTF-8: NUL is two bytes and characters outside the BMP are surrogate pairs.
+        text = self._read(length).replace(b'\xc0\x80', b'\x00').decode('utf-8', 'surrogatepass')
+        return text.encode('utf-16', 'surrogatepass').decode('utf-16')
+
+    def read_nullable_utf(self):
+        return self.read_utf() if self.read_boolean() else None
+
+
+def track_version(track: str):
+    """
+    Returns the encoding version of the given base64-encoded track, without decoding the rest of it.
+    ----------
+    :param track:
+        The base64-encoded `track` string.
+    """
+    header = b64decode(track[:8])
+    flags = (struct.unpack('>i', header[:4])[0] >> 30) & 3
+    return header[4] if flags & 1 else 1
+
+
+def decode_track(track: str):
+    """
+    Decodes a base64-encoded track string locally, without querying Lavalink.
+    Note that the track string doesn't say whether the track is seekable, so this
+    is assumed for every track that isn't a stream.
+    ----------
+    :param track:
+        The base64-encoded `track` string.
+
+    Returns
+    ---------
+    A dict in the same format as tracks returned from Lavalink.
+    """
+    reader = _DataReader(b64decode(track))
+    flags = (reader.read_int() >> 30) & 3
+    version = reader.read_byte() if flags & 1 else 1
+
+    title = reader.read_utf()
+    author = reader.read_utf()
+    length = reader.read_long()
+    identifier = reader.read_utf()
+    is_stream = reader.read_boolean()
+    uri = reader.read_nullable_utf() if version >= 2 else None
+
+    return {
+        'track': track,
+        'info': {
+            'identifier': identifier,
+            'isSeekable': not is_stream,
+            'author': author,
+            'length': length,
+            'isStream': is_stream,
+            'title': title,
+            'uri': uri
+        }
+    }
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+from time import monotonic, time
+
+from .metrics import Histogram
+
+log = logging.getLogger('lavalink')
+
+
+class Watchdog:
+    """
+    A background task that finds players that should be playing, but haven't received a
+    ``playerUpdate`` from their node for a while, and tries to recover them.
+    The watchdog is started with :func:`PlayerManager.start_watchdog`.
+
+    Recovery is attempted in stages, cheapest first, moving on to the next stage when
+    the player is still silent ``grace`` seconds after the previous one:
+
+    1. ``voice`` - Re-sends the player's voice update to its node.
+    2. ``play`` - Plays the current track again, at the position it should have reached.
+    3. ``node`` - Moves the player to another node.
+
+    The time from a player being found silent to it receiving an update again is
+    recorded in :attr:`recovery_latency`, in milliseconds.
+
+    Parameters
+    ----------
+    interval: Optional[float]
+        The amount of seconds between checks.
+    update_interval: Optional[float]
+        The amount of seconds between the ``playerUpdate`` frames sent by the nodes.
+    missed_updates: Optional[int]
+        The amount of consecutive updates a player has to miss before it's considered silent.
+    grace: Optional[float]
+        The amount of seconds to wait for an update after a recovery stage, before trying the next one.
+    """
+    stages = ('voice', 'play', 'node')
+
+    def __init__(self, interval: float = 5, update_interval: float = 5, missed_updates: int = 3, grace: float = 10):
+        self.interval = interval
+        self.update_interval = update_interval
+        self.missed_updates = missed_updates
+        self.grace = grace
+
+        self.recovery_latency = Histogram()
+        self.recovered = {stage: 0 for stage in self.stages}
+        self.failed = 0
+
+        self._manager = None
+        self._task = None
+        self._recovering = {}  # guild_id -> [stage index, found silent at, last attempt at, last_update after it]
+
+    @property
+    def running(self):
+        """ Returns whether the watchdog is running. """
+        return self._task is not None and not self._task.done()
+
+    def start(self, manager):
+        """
+        Starts checking the players of the given manager periodically.
+        ----------
+        :param manager:
+            The :class:`PlayerManager` to watch.
+        """
+        self._manager = manager
+
+        if not self.running:
+            self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        """ Stops the watchdog. """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        self._recovering.clear()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+
+            try:
+                await self.check()
+            except Exception as e:  # pylint: disable=W0703
+                log.warning('Watchdog encountered an exception! {}'.format(e))
+
+    def _last_heard(self, player):
+        """ Returns when the player last received an update, or was last told to play if it hasn't yet. """
+        return max(player.last_update / 1000, player._last_active)
+
+    def _should_be_playing(self, player):
+        return getattr(player, 'is_playing', False) and not player.paused and player.node.available
+
+    async def check(self):
+        """|coro|
+
+        Performs a single check, recovering silent players as necessary.
+        """
+        now = time()
+        silent_after = self.update_interval * self.missed_updates
+
+        for guild_id, state in list(self._recovering.items()):
+            player = self._manager.get(guild_id)
+
+            if player is None or not self._should_be_playing(player):
+                del self._recovering[guild_id]
+            elif player.last_update > state[3]:
+                del self._recovering[guild_id]
+                self.recovered[self.stages[state[0]]] += 1
+                self.recovery_latency.record((player.last_update / 1000 - state[1]) * 1000)
+                log.info('[NODE-{}] Player {} recovered after {}'.format(player.node.name, guild_id, self.stages[state[0]]))
+
+        for guild_id, player in list(self._manager.players.items()):
+            if not hasattr(player, 'last_update') or not self._should_be_playing(player):
+                continue
+
+            state = self._recovering.get(guild_id)
+
+            if state is None:
+                if now - self._last_heard(player) < silent_after:
+                    continue
+
+                log.warning('[NODE-{}] Player {} has gone silent'.format(player.node.name, guild_id))
+                state = self._recovering[guild_id] = [0, now, now, 0]
+            elif now - state[2] < self.grace:
+                continue
+            elif state[0] + 1 < len(self.stages):
+                state[0] += 1
+                state[2] = now
+            else:
+                log.warning('[NODE-{}] Failed to recover player {}'.format(player.node.name, guild_id))
+                self.failed += 1
+                del self._recovering[guild_id]
+                player._last_active = now  # Wait for it to go silent again before starting over.
+                continue
+
+            await self._recover(player, self.stages[state[0]])
+            state[3] = player.last_update  # Only updates received after this attempt count.
+
+    async def _recover(self, player, stage: str):
+        log.debug('[NODE-{}] Attempting {} recovery of player {}'.format(player.node.name, stage, player.guild_id))
+
+        if stage == 'voice':
+            await player._dispatch_voice_update(force=True)
+        elif stage == 'play':
+            if player.last_update:
+                position = player.position
+            else:  # It never started, so work out the position from when it was told to play.
+                position = min(time() * 1000 - player._track_sent_at, player.current.duration)
+
+            player._track_sent_at = time() * 1000 - position
+            await player.node._send(op='play', guildId=player.guild_id, track=player.current.track, startTime=int(position))
+        else:
+            manager = player.node._manager
+            nodes = [n for n in manager.available_nodes if n is not player.node and not n.draining]
+
+            if nodes:
+                node = min(nodes, key=lambda n: (n.over_capacity, n.penalty))
+                node._player_placed()
+                player._migrated_at = monotonic()
+                await player.change_node(node)
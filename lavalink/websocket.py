@@ -1,20 +1,45 @@
 import asyncio
+import heapq
+import itertools
 import logging
+from time import monotonic
 import aiohttp
+from .metrics import Histogram
 from .stats import Stats
 from .events import TrackEndEvent, TrackExceptionEvent, TrackStuckEvent, WebSocketClosedEvent
+from .exceptions import NodeException
 
 log = logging.getLogger('lavalink')
 
 
 class WebSocket:
+    # Payloads are written by a single task, in two tiers. Ops that control the connection or playback
+    # keep their relative order and are always written first. Cosmetic ops come last and are coalesced
+    # per guild, so a flood of them can't delay anything else.
+    _cosmetic_ops = ('volume', 'equalizer', 'filters')
+
     def __init__(self, node, host: str, port: int, password: str, resume_key: str, resume_timeout: int):
         self._node = node
         self._lavalink = self._node._manager._lavalink
 
-        self._session = self._lavalink._session
+        self._session = self._node._session
         self._ws = None
         self._message_queue = []
+        self._batches = {}  # guild_id -> [depth, payloads held back for a bulk operation]
+
+        self._send_queue = []  # A heap of (tier, sequence, queued at, payload or coalescing key, delivery waiters).
+        self._send_queue_size = 1000  # Cosmetic ops wait for space beyond this many queued payloads.
+        self._sequence = itertools.count()
+        self._coalesced = {}
+        self._coalesced_waiters = {}
+        self._send_ready = asyncio.Event()
+        self._send_space = asyncio.Event()
+        self.send_latency = Histogram()
+        self.coalesced_sends = 0
+
+        self._created_at = monotonic()
+        self._ready = asyncio.Event()
+        self.time_to_ready = None
 
         self._host = host
         self._port = port
@@ -23,6 +48,8 @@ class WebSocket:
         self._resume_timeout = resume_timeout
 
         self._resuming_configured = False
+        self._resume_task = None
+        self._closed = False
 
         self._shards = self._lavalink._shard_count
         self._user_id = self._lavalink._user_id
@@ -32,13 +59,19 @@ class WebSocket:
                          aiohttp.WSMsgType.closed]
 
         self._loop = self._lavalink._loop
-        asyncio.ensure_future(self.connect())
+        self._connect_task = asyncio.ensure_future(self.connect())
+        self._write_task = asyncio.ensure_future(self._write_loop())
 
     @property
     def connected(self):
         """ Returns whether the websocket is connected to Lavalink. """
         return self._ws is not None and not self._ws.closed
 
+    @property
+    def send_queue_depth(self):
+        """ Returns the amount of payloads waiting to be written. """
+        return len(self._send_queue)
+
     async def connect(self):
         """ Attempts to establish a connection to Lavalink. """
         headers = {
@@ -52,7 +85,7 @@ class WebSocket:
 
         attempt = 0
 
-        while not self.connected:
+        while not self.connected and not self._closed:
             attempt += 1
 
             try:
@@ -62,9 +95,32 @@ class WebSocket:
                 if attempt == 1:
                     log.warning('[NODE-{}] Failed to establish connection!'.format(self._node.name))
 
-                backoff = min(10 * attempt, 60)
+                if self._resume_task:  # Retry quicker so we make it back before the session expires.
+                    backoff = min(2 * attempt, 10)
+                else:
+                    backoff = min(10 * attempt, 60)
+
                 await asyncio.sleep(backoff)
             else:
+                resume_failed = False
+
+                if self._resume_task:
+                    self._resume_task.cancel()
+                    self._resume_task = None
+                    # Older Lavalink versions don't send this header, in which case we have to assume it worked.
+                    response = getattr(self._ws, '_response', None)
+                    resume_failed = response is not None and response.headers.get('Session-Resumed') == 'false'
+
+                    if resume_failed:
+                        log.warning('[NODE-{}] Session could not be resumed'.format(self._node.name))
+                        self._resuming_configured = False
+                    else:
+                        log.info('[NODE-{}] Session resumed'.format(self._node.name))
+
+                if self.time_to_ready is None:
+                    self.time_to_ready = monotonic() - self._created_at
+
+                self._ready.set()
                 await self._node._manager._node_connect(self._node)
                 asyncio.ensure_future(self._listen())
 
@@ -73,12 +129,18 @@ class WebSocket:
                     await self._send(op='configureResuming', key=self._resume_key, timeout=self._resume_timeout)
                     self._resuming_configured = True
 
+                if resume_failed:
+                    self._drop_player_payloads()
+
                 if self._message_queue:
                     for message in self._message_queue:
                         await self._send(**message)
 
                     self._message_queue.clear()
 
+                if resume_failed:  # The node forgot about its players, so they need to be set up again.
+                    await self._node._manager._move_players(self._node)
+
     async def _listen(self):
         async for msg in self._ws:
             log.debug('[NODE-{}] Received WebSocket message: {}'.format(self._node.name, msg.data))
@@ -90,16 +152,62 @@ class WebSocket:
                 return
         await self._websocket_closed()
 
+    async def close(self):
+        """ Closes the connection to Lavalink, without reconnecting. """
+        self._closed = True
+        self._ready.clear()
+
+        for task in (self._connect_task, self._write_task, self._resume_task):
+            if task is not None:
+                task.cancel()
+
+        self._resume_task = None
+
+        for entry in self._send_queue:
+            self._settle(entry[4], NodeException('The connection was closed before the payload was sent'))
+
+        self._send_queue.clear()
+        self._coalesced.clear()
+        self._coalesced_waiters.clear()
+
+        if self._ws is not None:
+            await self._ws.close()
+
     async def _websocket_closed(self, code: int = None, reason: str = None):
         self._ws = None
-        await self._node._manager._node_disconnect(self._node, code, reason)
+        self._ready.clear()
+
+        if self._closed:
+            return
+
+        resuming = self._resuming_configured and self._resume_task is None
+
+        await self._node._manager._node_disconnect(self._node, code, reason, resuming)
+
+        if resuming:
+            self._resume_task = asyncio.ensure_future(self._resume_expired())
+
         await self.connect()
 
+    async def _resume_expired(self):
+        await asyncio.sleep(self._resume_timeout)
+        self._resume_task = None
+        self._resuming_configured = False  # Lavalink has discarded the session by now.
+
+        log.warning('[NODE-{}] Session was not resumed within {} seconds'.format(self._node.name, self._resume_timeout))
+        self._drop_player_payloads()
+        await self._node._manager._move_players(self._node)
+
+    def _drop_player_payloads(self):
+        """ Drops payloads queued for players while disconnected, as they'd recreate players the node has forgotten. """
+        self._message_queue = [m for m in self._message_queue if 'guildId' not in m]
+
     async def _handle_message(self, data: dict):
         op = data['op']
 
         if op == 'stats':
             self._node.stats = Stats(self._node, data)
+            self._node._manager._stats_updated(self._node)
         elif op == 'playerUpdate':
             player = self._lavalink.players.get(int(data['guildId']))
 
@@ -140,10 +248,151 @@ class WebSocket:
         if player:
             await player.handle_event(event)
 
+    def _start_batch(self, guild_ids):
+        """
+        Holds back payloads sent for the given guilds until the matching :func:`_flush_batch`.
+        Payloads for other guilds are sent as usual.
+        """
+        for guild_id in guild_ids:
+            self._batches.setdefault(guild_id, [0, []])[0] += 1
+
+    async def _flush_batch(self, guild_ids):
+        """
+        Writes every payload held back for the given guilds since :func:`_start_batch` in one go,
+        and waits until they've been written.
+
+        Returns
+        ---------
+        A dict of guild_id -> the exception that prevented one of its payloads from being written.
+        """
+        batch = []
+
+        for guild_id in guild_ids:
+            held = self._batches[guild_id]
+            held[0] -= 1
+
+            if held[0] == 0:
+                del self._batches[guild_id]
+                batch.extend(held[1])
+
+        if not batch:
+            return {}
+
+        log.debug('[NODE-{}] Queueing batch of {} payloads'.format(self._node.name, len(batch)))
+        waiters = []
+
+        for data in batch:
+            waiter = self._loop.create_future()
+            waiters.append(waiter)
+            await self._enqueue(data, waiter)
+
+        failed = {}
+
+        for data, outcome in zip(batch, await asyncio.gather(*waiters, return_exceptions=True)):
+            if isinstance(outcome, Exception):
+                failed.setdefault(data['guildId'], outcome)
+
+        return failed
+
     async def _send(self, **data):
-        if self.connected:
-            log.debug('[NODE-{}] Sending payload {}'.format(self._node.name, str(data)))
-            await self._ws.send_json(data)
+        if data.get('guildId') in self._batches:
+            self._batches[data['guildId']][1].append(data)
+        elif self.connected:
+            await self._enqueue(data)
         else:
             log.debug('[NODE-{}] Send called before WebSocket ready!'.format(self._node.name))
             self._message_queue.append(data)
+
+    async def _enqueue(self, data: dict, waiter: asyncio.Future = None):
+        """ Queues a payload to be written. ``waiter`` is resolved once it's written, or fails if it can't be. """
+        op = data.get('op')
+        cosmetic = op in self._cosmetic_ops
+        key = (data.get('guildId'), op)
+        waiters = [waiter] if waiter is not None else []
+
+        if self._closed:
+            self._settle(waiters, NodeException('The connection was closed before the payload was sent'))
+            return
+
+        if op == 'destroy':  # Cosmetic ops would otherwise be written after this and recreate the player.
+            for cosmetic_op in self._cosmetic_ops:
+                self._coalesced.pop((data.get('guildId'), cosmetic_op), None)
+                self._settle(self._coalesced_waiters.pop((data.get('guildId'), cosmetic_op), ()))
+
+        if cosmetic:
+            while len(self._send_queue) >= self._send_queue_size and key not in self._coalesced:
+                self._send_space.clear()
+                await self._send_space.wait()
+
+            if key in self._coalesced:
+                self._coalesced[key] = self._merge(self._coalesced[key], data)
+                self._coalesced_waiters[key].extend(waiters)
+                self.coalesced_sends += 1
+                return
+
+            self._coalesced[key] = data
+            self._coalesced_waiters[key] = waiters
+
+        heapq.heappush(self._send_queue, (int(cosmetic), next(self._sequence), monotonic(), key if cosmetic else data, waiters))
+        self._send_ready.set()
+
+    @staticmethod
+    def _settle(waiters, error: Exception = None):
+        for waiter in waiters:
+            if waiter.done():
+                continue
+
+            if error is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(error)
+
+    @staticmethod
+    def _merge(queued: dict, data: dict):
+        """ Merges a cosmetic payload into the one that's already queued for the same guild. """
+        if data.get('op') != 'equalizer':
+            return data
+
+        bands = {b['band']: b for b in queued.get('bands', ())}
+        bands.update((b['band'], b) for b in data.get('bands', ()))
+        return dict(data, bands=list(bands.values()))
+
+    async def _write_loop(self):
+        while True:
+            if not self._send_queue:
+                self._send_ready.clear()
+                await self._send_ready.wait()
+                continue
+
+            cosmetic, _, queued_at, item, waiters = heapq.heappop(self._send_queue)
+
+            if len(self._send_queue) < self._send_queue_size:
+                self._send_space.set()
+
+            if cosmetic:
+                data = self._coalesced.pop(item, None)
+                self._coalesced_waiters.pop(item, None)
+            else:
+                data = item
+
+            if data is None:  # Dropped because the player was destroyed, its waiters were settled then.
+                continue
+
+            if not self.connected:
+                self._message_queue.append(data)
+                self._settle(waiters, NodeException('The node disconnected before the payload was sent'))
+                continue
+
+            try:
+                log.debug('[NODE-{}] Sending payload {}'.format(self._node.name, str(data)))
+                await self._ws.send_json(data)
+            except asyncio.CancelledError:
+                self._settle(waiters, NodeException('The connection was closed before the payload was sent'))
+                raise
+            except Exception as e:  # pylint: disable=W0703
+                log.warning('[NODE-{}] Failed to send payload, it will be retried after reconnecting: {}'.format(self._node.name, e))
+                self._message_queue.append(data)
+                self._settle(waiters, e)
+            else:
+                self.send_latency.record((monotonic() - queued_at) * 1000)
+                self._settle(waiters)